@@ -3,6 +3,18 @@ ASGI config for maxBreak project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live score stream at ``oneFourSeven/live/`` holds one idle coroutine per
+client and is only served over ASGI (over WSGI it answers 501). Run it as a
+separate process next to the WSGI application (``maxBreak.wsgi``)::
+
+    uvicorn maxBreak.asgi:application --port 8001
+
+and have the reverse proxy send ``/oneFourSeven/live/`` to that port and
+everything else to the WSGI server. Serving the REST endpoints from this
+process too works, but costs concurrency: Django runs every sync view under
+ASGI through ``sync_to_async(thread_sensitive=True)``, so all REST requests
+of a process share one thread and queue behind each other.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -48,6 +49,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # gzip / brotli; first so it compresses what every other middleware produced
+    'oneFourSeven.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,8 +71,36 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed when orjson is installed, otherwise the stock JSONRenderer;
+    # columnar JSON and (with msgpack installed) MessagePack through Accept or ?format=.
+    # orjson, msgpack and Brotli (for CompressionMiddleware) are optional but listed in requirements.txt
+    'DEFAULT_RENDERER_CLASSES': [
+        'oneFourSeven.renderers.FastJSONRenderer',
+        'oneFourSeven.renderers.ColumnarJSONRenderer',
+        *(['oneFourSeven.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# snooker.org API client (oneFourSeven/client.py)
+SNOOKER_API_REQUESTS_PER_MINUTE = 10
+# Token bucket shared by all processes; BURST is how many requests may go out back to back.
+SNOOKER_API_RATE_LIMIT_DB = BASE_DIR / 'ratelimit.sqlite3'
+SNOOKER_API_BURST = 3
+# Longest a web request (tour details) waits for a token; beyond it the view answers 503 with Retry-After
+SNOOKER_API_INTERACTIVE_MAX_WAIT = 2
+SNOOKER_API_POOL_SIZE = 4
+SNOOKER_API_TIMEOUT = 30
+SNOOKER_SEASON_TTL = 60 * 60
+# 'live', 'record' (also save every response to SNOOKER_API_ARCHIVE) or 'replay' (serve from it, offline)
+SNOOKER_API_MODE = os.getenv('SNOOKER_API_MODE', 'live')
+SNOOKER_API_ARCHIVE = os.getenv('SNOOKER_API_ARCHIVE', BASE_DIR / 'snooker_api.json.gz')
+SNOOKER_API_REPLAY_LATENCY = float(os.getenv('SNOOKER_API_REPLAY_LATENCY', '0'))
+# Query type of the API's "matches updated in the last ds seconds" listing, used for incremental syncs
+SNOOKER_API_UPDATED_MATCHES_TYPE = 17
+# Rows per INSERT/UPDATE statement when the scraper writes a payload (oneFourSeven/ingest.py)
+SCRAPER_BULK_BATCH_SIZE = 500
+
 ROOT_URLCONF = 'maxBreak.urls'
 
 TEMPLATES = [
@@ -100,6 +131,47 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# API responses are cached per table version (oneFourSeven/cache.py), so entries never go stale.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'maxbreak',
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = 6 * 60 * 60
+# 0-11; 5 compresses about as well as gzip -9 at a fraction of brotli's top-quality cost
+RESPONSE_BROTLI_QUALITY = 5
+# Most player IDs accepted by one players_by_ids request
+PLAYER_BATCH_MAX_IDS = 200
+# Most event IDs accepted by one ?event= filter (match lists and the live stream)
+EVENT_FILTER_MAX_IDS = 50
+# Rows fetched and sent per chunk by ?stream= responses (oneFourSeven/listing.py)
+STREAM_CHUNK_SIZE = 2000
+
+# Live score stream (oneFourSeven/live.py): seconds between data version checks while clients
+# are connected, seconds between keep-alive comments, frames buffered per client before it is dropped
+LIVE_POLL_INTERVAL = 2
+LIVE_HEARTBEAT = 15
+LIVE_QUEUE_SIZE = 256
+
+# A stored match counts as live from LIVE_MATCH_LEAD seconds before its scheduled start until
+# LIVE_MATCH_SPAN seconds after it (oneFourSeven/scraper.py: live_matches)
+LIVE_MATCH_LEAD = 10 * 60
+LIVE_MATCH_SPAN = 5 * 60 * 60
+# Days after its end date an event's matches are still refreshed; after that they are kept as they are
+EVENT_TRACKING_GRACE = 1
+
+# Scraper scheduler (manage.py run_scheduler, oneFourSeven/scheduler.py): seconds between runs of
+# the jobs named here (the others keep scheduler.DEFAULT_INTERVALS), the longest live matches
+# interval while no match is live, and the status file it writes
+SCHEDULER_INTERVALS = {}
+SCHEDULER_IDLE_INTERVAL = 15 * 60
+SCHEDULER_STATUS_FILE = BASE_DIR / 'scheduler_status.json'
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
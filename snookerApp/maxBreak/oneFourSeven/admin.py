@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MatchesOfAnEvent, Player,Event,Ranking,UpcomingMatch
+from .models import Frame, MatchesOfAnEvent, Player,Event,Ranking,UpcomingMatch
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -17,4 +17,5 @@ class EventsAdmin(admin.ModelAdmin):
 admin.site.register(UpcomingMatch)
 
 admin.site.register(Ranking)
-admin.site.register(MatchesOfAnEvent)
\ No newline at end of file
+admin.site.register(MatchesOfAnEvent)
+admin.site.register(Frame)
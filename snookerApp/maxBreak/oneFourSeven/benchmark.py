@@ -0,0 +1,131 @@
+"""
+Seed data, routes and query budgets shared by the API tests (tests.py) and
+``manage.py bench_api``.
+
+``seed_database()`` bulk-inserts realistic volumes: a full player list,
+several seasons of rankings, events and matches (with their frames) and a
+page of upcoming matches. ``ROUTES`` lists every read endpoint with the
+most queries an uncached request may run and its p95 latency budget; the
+tests check the query counts, the benchmark command the latencies.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+
+from .frames import match_frames
+from .models import Event, Frame, MatchesOfAnEvent, Player, Ranking, UpcomingMatch
+
+# Seeded volumes at scale 1.
+PLAYERS = 1500
+SEASONS = [2021, 2022, 2023, 2024, 2025]
+EVENTS_PER_SEASON = 45
+RANKED_PER_SEASON = 400
+MATCHES = 3000
+UPCOMING = 150
+
+# The seeded seasons are all over; match lists name their events (the default is today's).
+LAST_SEASON_EVENTS = ','.join(str(SEASONS[-1] * 1000 + n) for n in range(10))
+
+# Route name -> (path, max queries per uncached request, p95 budget in ms).
+ROUTES = {
+    'user-list': ('/oneFourSeven/users/', 1, 150),
+    'player_details': ('/oneFourSeven/player_by_id/1/', 2, 50),
+    'players_by_ids': ('/oneFourSeven/players_by_ids/?ids=' + ','.join(map(str, range(1, 41))), 2, 80),
+    'season_events': ('/oneFourSeven/events/', 2, 400),
+    'event_calendar': ('/oneFourSeven/events/calendar/', 2, 60),
+    'event_calendar?season': ('/oneFourSeven/events/calendar/?season=2023&fields=ID,Name,StartDate,EndDate,active,past',
+                              2, 30),
+    'players': ('/oneFourSeven/players/M/', 2, 1500),
+    'ranking': ('/oneFourSeven/ranking/', 2, 1000),
+    # Keyset pages and column selection: no COUNT(*), no full-table serialization.
+    'ranking?cursor': ('/oneFourSeven/ranking/?page_size=100', 2, 60),
+    'players?fields': ('/oneFourSeven/players/M/?fields=ID,ShortName', 2, 300),
+    'players?fields&cursor': ('/oneFourSeven/players/M/?fields=ID,ShortName&page_size=200', 2, 40),
+    'ranking_with_players': ('/oneFourSeven/ranking/players/', 2, 300),
+    'upcoming_matches': ('/oneFourSeven/matches/upcoming/', 3, 100),
+    'curr_ev_matches': ('/oneFourSeven/curr_tour_matches/upcoming/', 3, 100),
+    'curr_ev_matches?event': ('/oneFourSeven/curr_tour_matches/upcoming/?event=' + LAST_SEASON_EVENTS, 3, 100),
+    # Expanded variants: player and event names resolved in two extra queries per page.
+    'upcoming_matches?expand': ('/oneFourSeven/matches/upcoming/?expand=1', 5, 120),
+    'curr_ev_matches?expand': ('/oneFourSeven/curr_tour_matches/upcoming/?expand=1&event=' + LAST_SEASON_EVENTS,
+                               5, 120),
+    'curr_ev_matches?cursor': ('/oneFourSeven/curr_tour_matches/upcoming/?page_size=20&event=' + LAST_SEASON_EVENTS,
+                               2, 100),
+    'match_frames': ('/oneFourSeven/matches/4/frames/', 2, 50),
+    'tour_details': ('/oneFourSeven/tours/1000/', 0, 50),
+}
+# Routes that are not read endpoints, and the endless live stream (see tests.LiveScoreTests).
+NOT_BENCHMARKED = {'api-root', 'user-detail', 'login', 'logout', 'live_scores'}
+# Routes that are not backed by scraped tables and so have no data version.
+UNVERSIONED = {'user-list', 'tour_details'}
+
+TOUR_DETAILS = [{'ID': 1000, 'Name': 'Synthetic Open'}]
+
+
+def seed_database(scale=1.0):
+    """Bulk-inserts the benchmark data set, its volumes multiplied by ``scale``."""
+    players, events_per_season = int(PLAYERS * scale), max(10, int(EVENTS_PER_SEASON * scale))
+    ranked, matches, upcoming = int(RANKED_PER_SEASON * scale), int(MATCHES * scale), int(UPCOMING * scale)
+    Player.objects.bulk_create(
+        Player(ID=i, FirstName=f'First{i}', LastName=f'Last{i}', ShortName=f'F Last{i}',
+               Nationality='England', Sex='M' if i % 10 else 'F', Born=date(1990, 1, 1),
+               FirstSeasonAsPro=2010, NumRankingTitles=i % 7, NumMaximums=i % 3)
+        for i in range(1, players + 1)
+    )
+    Ranking.objects.bulk_create(
+        Ranking(ID=season * 100000 + n, Position=n, PlayerID=n, Season=season,
+                Sum=1000000 - n * 1000, Type='MoneyRankings')
+        for season in SEASONS for n in range(1, ranked + 1)
+    )
+    events = []
+    for season in SEASONS:
+        first = date(season, 7, 1)
+        for n in range(events_per_season):
+            start = first + timedelta(days=7 * n)
+            events.append(Event(
+                ID=season * 1000 + n, Name=f'Synthetic Open {season}/{n}', Season=season,
+                StartDate=start, EndDate=start + timedelta(days=6), Venue='Venue', City='City',
+                Country='England', Tour='Ranking', NumCompetitors=128,
+            ))
+    Event.objects.bulk_create(events)
+    now = datetime.now(dt_timezone.utc)
+    MatchesOfAnEvent.objects.bulk_create(
+        MatchesOfAnEvent(ID=n, EventID=events[n % len(events)].ID, Round=n % 7, Number=n,
+                         Player1ID=1 + n % players, Player2ID=1 + (n + 1) % players, Score1=n % 5,
+                         Score2=n % 3, ScheduledDate=now + timedelta(minutes=n),
+                         FrameScores='; '.join(f'{60 + f}-{30 + f}' for f in range(n % 5)))
+        for n in range(1, matches + 1)
+    )
+    Frame.objects.bulk_create(
+        frame for match_id, frame_scores in MatchesOfAnEvent.objects.values_list('ID', 'FrameScores')
+        for frame in match_frames(match_id, frame_scores)
+    )
+    UpcomingMatch.objects.bulk_create(
+        UpcomingMatch(ID=n, EventID=events[-1].ID, Round=1, Number=n, Player1ID=1 + n % players,
+                      Player2ID=1 + (n + 1) % players, ScheduledDate=now + timedelta(hours=n))
+        for n in range(1, upcoming + 1)
+    )
+    # Values the renderers treat specially: non-ASCII, U+2028/U+2029, quotes and control characters.
+    Player.objects.create(ID=players + 1, FirstName='Jùnhuī', LastName='Dīng', ShortName='丁俊晖',
+                          Nationality='China', Sex='M', TeamName='line\u2028separator\u2029"quoted"\n\ttab\x01')
+
+
+class QueryCounter:
+    """
+    Counts queries through a connection execute wrapper. CaptureQueriesContext
+    is not usable around client requests: request_started resets the query log.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def count_queries(function, *args, **kwargs):
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        result = function(*args, **kwargs)
+    return result, counter.count
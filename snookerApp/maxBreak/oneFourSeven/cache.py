@@ -0,0 +1,139 @@
+"""Response caching and conditional GETs for read-only endpoints.
+
+Every cached response is keyed by the endpoint, its query string and the
+current ``DataVersion`` of the tables it reads. The scraper bumps a table's
+version whenever it writes to it, so stale entries are simply never looked
+up again; no explicit purge is needed and it works across processes even
+with the local-memory backend. The same versions give each response a
+strong ETag and a Last-Modified date, so clients holding a fresh copy get a
+304 before the view (or its serializer) runs.
+
+Responses that also depend on today's date (e.g. which events are active)
+are declared ``daily``: the date becomes part of the key and ETag, and
+cached copies expire at midnight.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import DataVersion
+
+
+def table_name(model):
+    return model._meta.db_table
+
+
+def bump_versions(*models):
+    """Marks the given models' tables as changed."""
+    now = timezone.now()
+    for model in models:
+        name = table_name(model)
+        updated = DataVersion.objects.filter(Table=name).update(Version=F('Version') + 1, Updated=now)
+        if not updated:
+            DataVersion.objects.get_or_create(Table=name, defaults={'Version': 1})
+
+
+def get_versions(*models):
+    """Returns ``{table name: DataVersion}`` for the given models in a single query."""
+    names = [table_name(model) for model in models]
+    versions = {v.Table: v for v in DataVersion.objects.filter(Table__in=names)}
+    return {name: versions.get(name) for name in names}
+
+
+def request_versions(request, models):
+    """Like :func:`get_versions`, but looked up once per request however many decorators ask."""
+    memo = request.__dict__.setdefault('_data_versions', {})
+    if models not in memo:
+        memo[models] = get_versions(*models)
+    return memo[models]
+
+
+def version_token(versions):
+    return ",".join(f"{name}:{v.Version if v else 0}" for name, v in sorted(versions.items()))
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def seconds_until_midnight():
+    now = timezone.localtime()
+    return max(1, int((start_of_day(now.date() + timedelta(days=1)) - now).total_seconds()))
+
+
+def response_cache_key(request, versions, day=None):
+    raw = "|".join([
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        request.META.get('HTTP_ACCEPT', ''),
+        version_token(versions),
+        day.isoformat() if day else '',
+    ])
+    return "oneFourSeven:response:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+def cache_response(*models, timeout=None, daily=False):
+    """
+    Caches successful GET responses of a view until one of ``models`` changes
+    (and, when ``daily``, until midnight).
+
+    Works on function views (outside ``@api_view``) and, through
+    ``method_decorator(..., name='dispatch')``, on class-based views.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            day = timezone.localdate() if daily else None
+            key = response_cache_key(request, request_versions(request, models), day)
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                return HttpResponse(content, headers=headers)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+                expires = timeout if timeout is not None else getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 6 * 60 * 60)
+                if daily:
+                    expires = min(expires, seconds_until_midnight())
+                cache.set(key, (response.content, dict(response.items())), expires)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_response(*models, daily=False):
+    """
+    Adds an ETag and Last-Modified derived from ``models``' data versions and
+    answers ``If-None-Match`` / ``If-Modified-Since`` with 304 when they match.
+    """
+    def etag(request, *args, **kwargs):
+        # Query string and Accept are part of the tag: each representation gets its own.
+        day = timezone.localdate() if daily else None
+        return response_cache_key(request, request_versions(request, models), day).rsplit(':', 1)[1]
+
+    def last_modified(request, *args, **kwargs):
+        updated = [v.Updated for v in request_versions(request, models).values() if v]
+        if daily:
+            # A copy from before midnight is stale even if no table changed since.
+            updated.append(start_of_day(timezone.localdate()))
+        return max(updated) if updated else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def versioned_response(*models, daily=False):
+    """Conditional GET support plus response caching, both keyed on ``models``' data versions."""
+    def decorator(view):
+        return conditional_response(*models, daily=daily)(cache_response(*models, daily=daily)(view))
+    return decorator
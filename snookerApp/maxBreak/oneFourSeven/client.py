@@ -0,0 +1,227 @@
+"""Shared HTTP client for the snooker.org API.
+
+All scraper requests go through one keep-alive ``requests.Session`` so TLS
+handshakes are paid once per run, and through a token bucket shared by every
+process (see ``ratelimit.py``) so concurrent fetches still respect the API's
+requests-per-minute budget. Feeds that are stored in the database can be
+fetched conditionally (see ``fetch_payload``), so a payload identical to the
+last stored one is neither parsed nor written again.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .ratelimit import TokenBucket
+
+API_BASE_URL = "https://api.snooker.org/"
+HEADERS = {"X-Requested-By": "FahimaApp128"}
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+_session = None
+_session_lock = threading.Lock()
+_limiter = None
+
+
+def api_mode():
+    """'live' (default), 'record' or 'replay'; see ``replay.py``."""
+    return _setting('SNOOKER_API_MODE', 'live')
+
+
+def get_session():
+    """Returns the shared keep-alive session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            mode = api_mode()
+            if mode == 'replay':
+                from .replay import ReplaySession
+                _session = ReplaySession(_setting('SNOOKER_API_ARCHIVE', None),
+                                         _setting('SNOOKER_API_REPLAY_LATENCY', 0.0))
+                return _session
+            pool_size = _setting('SNOOKER_API_POOL_SIZE', 4)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if mode == 'record':
+                from .replay import RecordingSession
+                session = RecordingSession(session, _setting('SNOOKER_API_ARCHIVE', None))
+            _session = session
+        return _session
+
+
+def reset_session():
+    """Drops the shared session and limiter, e.g. after switching SNOOKER_API_MODE."""
+    global _session, _limiter
+    with _session_lock:
+        _session = None
+        _limiter = None
+
+
+def get_limiter():
+    """Returns the token bucket guarding every request to the snooker.org API."""
+    global _limiter
+    with _session_lock:
+        if _limiter is None:
+            if api_mode() == 'replay':
+                from .replay import NoLimit
+                _limiter = NoLimit()
+            else:
+                _limiter = TokenBucket(
+                    _setting('SNOOKER_API_RATE_LIMIT_DB', 'ratelimit.sqlite3'),
+                    'snooker.org',
+                    rate=_setting('SNOOKER_API_REQUESTS_PER_MINUTE', 10) / 60.0,
+                    capacity=_setting('SNOOKER_API_BURST', 3),
+                )
+        return _limiter
+
+
+def _get(url, headers=None, max_wait=None):
+    get_limiter().acquire(max_wait=max_wait)
+    response = get_session().get(url, headers=headers, timeout=_setting('SNOOKER_API_TIMEOUT', 30))
+    response.raise_for_status()
+    return response
+
+
+def fetch_json(url, max_wait=None):
+    """
+    Fetches ``url`` through the shared session and returns the decoded JSON, or None on error.
+    With ``max_wait`` raises RateLimited instead of waiting longer than that for the rate limiter.
+    """
+    try:
+        return _get(url, max_wait=max_wait).json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error fetching data from {url}: {e}")
+        return None
+
+
+class Payload:
+    """Result of a conditional fetch. ``data`` is only set when ``changed`` is true."""
+
+    def __init__(self, url, changed, data=None, content_hash=None, etag=None, last_modified=None):
+        self.url = url
+        self.changed = changed
+        self.data = data
+        self.content_hash = content_hash
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def mark_stored(self):
+        """Records this payload as stored; call it only once its data has been saved."""
+        from .models import FetchState
+        if self.changed:
+            FetchState.objects.update_or_create(Url=self.url, defaults={
+                'ContentHash': self.content_hash,
+                'ETag': self.etag,
+                'LastModified': self.last_modified,
+            })
+
+
+def load_fetch_states(urls):
+    from .models import FetchState
+    return FetchState.objects.in_bulk(list(urls))
+
+
+_LOOKUP = object()
+
+
+def fetch_payload(url, state=_LOOKUP, force=False):
+    """
+    Fetches ``url`` unless the API (via ETag / Last-Modified) or the content
+    hash says it equals the payload last stored for it.
+
+    ``state`` is the URL's ``FetchState`` or None if it has none; it is looked
+    up when not given. ``force`` ignores it. Returns a ``Payload``, or None on
+    error.
+    """
+    if force:
+        state = None
+    elif state is _LOOKUP:
+        state = load_fetch_states([url]).get(url)
+    headers = {}
+    if state is not None:
+        if state.ETag:
+            headers['If-None-Match'] = state.ETag
+        if state.LastModified:
+            headers['If-Modified-Since'] = state.LastModified
+    try:
+        response = _get(url, headers)
+        if response.status_code == 304:
+            return Payload(url, changed=False)
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        if state is not None and state.ContentHash == content_hash:
+            return Payload(url, changed=False)
+        return Payload(
+            url, changed=True, data=response.json(), content_hash=content_hash,
+            etag=response.headers.get('ETag'), last_modified=response.headers.get('Last-Modified'),
+        )
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error fetching data from {url}: {e}")
+        return None
+
+
+def _run_parallel(function, items, max_workers):
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or _setting('SNOOKER_API_POOL_SIZE', 4), len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
+
+
+def fetch_many(urls, max_workers=None):
+    """Fetches independent URLs in parallel; results are returned in the order of ``urls``."""
+    return _run_parallel(fetch_json, urls, max_workers)
+
+
+def fetch_payloads(urls, max_workers=None, force=False):
+    """Parallel :func:`fetch_payload`; stored fetch states are loaded up front on the calling thread."""
+    urls = list(urls)
+    states = {} if force else load_fetch_states(urls)
+    return _run_parallel(lambda url: fetch_payload(url, states.get(url)), urls, max_workers)
+
+
+_current_season = None
+_current_season_at = 0.0
+_season_lock = threading.Lock()
+
+
+def get_current_season(refresh=False):
+    """Returns the current season (t=20), looked up at most once per run.
+
+    The value is memoized for ``SNOOKER_SEASON_TTL`` seconds so long-lived
+    processes still pick up a season rollover. A failed lookup keeps the
+    previous value, if any.
+    """
+    global _current_season, _current_season_at
+    with _season_lock:
+        ttl = _setting('SNOOKER_SEASON_TTL', 3600)
+        fresh = time.monotonic() - _current_season_at < ttl
+        if _current_season is not None and fresh and not refresh:
+            return _current_season
+        season_data = fetch_json(f"{API_BASE_URL}?t=20")
+        if season_data and season_data[0]:
+            _current_season = season_data[0]['CurrentSeason']
+            _current_season_at = time.monotonic()
+        return _current_season
+
+
+def reset_current_season():
+    """Forgets the memoized season so the next lookup hits the API again."""
+    global _current_season, _current_season_at
+    with _season_lock:
+        _current_season = None
+        _current_season_at = 0.0
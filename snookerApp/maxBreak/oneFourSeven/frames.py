@@ -0,0 +1,74 @@
+"""Frame-by-frame scores, parsed from the API's ``FrameScores`` strings.
+
+snooker.org sends a match's frames as one string, frames separated by
+``;``, each frame ``<player 1 points>-<player 2 points>`` with the breaks
+of 50 or more in brackets after a player's points::
+
+    "60-30; 0-124(124); 73(51)-14; 131(52, 71)-0"
+
+The scraper stores one ``Frame`` row per frame as it writes the match, so
+frame-level questions (frames with a century, frames over 100 points) are
+indexed queries instead of a scan that parses every match's string. A
+frame keeps every break of each player in the API's order (``Breaks1``,
+``Breaks2``) and, indexed, each player's highest one (``Break1``,
+``Break2``).
+"""
+import re
+
+from .cache import bump_versions
+from .ingest import batch_size_setting
+from .models import Frame
+
+FRAME_SEPARATOR = ';'
+SIDE = re.compile(r'^\s*(\d+)\s*(?:\(\s*([\d\s,]*)\))?\s*$')
+
+
+def parse_side(text):
+    """``(points, [breaks])`` for one player's side of a frame, or None when unreadable."""
+    match = SIDE.match(text)
+    if match is None:
+        return None
+    return int(match.group(1)), [int(value) for value in re.findall(r'\d+', match.group(2) or '')]
+
+
+def parse_frame_scores(frame_scores):
+    """
+    ``[(number, points1, points2, breaks1, breaks2)]`` for a FrameScores string.
+    Frames are numbered by position; a frame that cannot be read is skipped
+    without renumbering the ones after it.
+    """
+    frames = []
+    for number, text in enumerate((frame_scores or '').split(FRAME_SEPARATOR), start=1):
+        # Split on the dash between the two sides; breaks never contain one.
+        sides = text.split('-')
+        if len(sides) != 2:
+            continue
+        first, second = parse_side(sides[0]), parse_side(sides[1])
+        if first is None or second is None:
+            continue
+        frames.append((number, first[0], second[0], first[1], second[1]))
+    return frames
+
+
+def match_frames(match_id, frame_scores):
+    return [Frame(MatchID=match_id, Number=number, Points1=points1, Points2=points2,
+                  Break1=max(breaks1, default=None), Break2=max(breaks2, default=None),
+                  Breaks1=breaks1, Breaks2=breaks2)
+            for number, points1, points2, breaks1, breaks2 in parse_frame_scores(frame_scores)]
+
+
+def store_frames(matches, deleted=(), batch_size=None):
+    """
+    Replaces the stored frames of ``matches`` (objects with ``ID`` and ``FrameScores``)
+    with their parsed frames and drops the frames of the ``deleted`` match IDs.
+    Called by the ingest layer inside the transaction that writes the matches.
+    """
+    batch_size = batch_size or batch_size_setting()
+    match_ids = [match.ID for match in matches] + list(deleted)
+    for start in range(0, len(match_ids), batch_size):
+        Frame.objects.filter(MatchID__in=match_ids[start:start + batch_size]).delete()
+    frames = [frame for match in matches for frame in match_frames(match.ID, match.FrameScores)]
+    Frame.objects.bulk_create(frames, batch_size=batch_size)
+    if match_ids:
+        bump_versions(Frame)
+    return frames
@@ -0,0 +1,259 @@
+"""Bulk ingestion of snooker.org payloads.
+
+A payload is validated with a single serializer instance, diffed against
+the rows already stored under the same primary keys, and only new or
+changed rows are written, in batches, inside one transaction. Tables that
+mirror a whole API listing (upcoming matches, matches of an event) are
+replaced the same way, so readers see either the old set or the new one,
+never a half-written table.
+"""
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator
+
+from .cache import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestReport:
+    table: str
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    invalid: int = 0
+    elapsed: float = 0.0
+    errors: list = field(default_factory=list, repr=False)
+
+    @property
+    def written(self):
+        return self.inserted + self.updated + self.deleted
+
+    def __str__(self):
+        return (f"{self.table}: {self.inserted} inserted, {self.updated} updated, "
+                f"{self.unchanged} unchanged, {self.deleted} deleted, "
+                f"{self.invalid} invalid in {self.elapsed:.3f}s")
+
+
+_collectors = []
+
+
+@contextmanager
+def collect_reports():
+    """Collects every IngestReport produced inside the block, e.g. for benchmarks."""
+    reports = []
+    _collectors.append(reports)
+    try:
+        yield reports
+    finally:
+        _collectors.remove(reports)
+
+
+def batch_size_setting():
+    return getattr(settings, 'SCRAPER_BULK_BATCH_SIZE', 500)
+
+
+def validate_payload(serializer_class, rows):
+    """
+    Validates every row with one serializer instance.
+
+    Returns ``(valid, invalid)`` where ``valid`` holds validated data dicts and
+    ``invalid`` holds ``(primary key, errors)`` pairs. The primary key's
+    uniqueness validator is dropped: it costs a query per row and rejects
+    exactly the rows we want to update.
+    """
+    serializer = serializer_class()
+    pk_name = serializer_class.Meta.model._meta.pk.name
+    pk_field = serializer.fields.get(pk_name)
+    if pk_field is not None:
+        pk_field.validators = [v for v in pk_field.validators if not isinstance(v, UniqueValidator)]
+
+    valid, invalid = [], []
+    for row in rows:
+        try:
+            valid.append(serializer.run_validation(row))
+        except ValidationError as e:
+            invalid.append((row.get(pk_name), e.detail))
+    return valid, invalid
+
+
+def load_existing(queryset, keys, batch_size):
+    """Loads the stored rows for ``keys`` as a ``{pk: instance}`` map, ``batch_size`` keys per query."""
+    keys = list(keys)
+    existing = {}
+    for start in range(0, len(keys), batch_size):
+        for obj in queryset.filter(pk__in=keys[start:start + batch_size]):
+            existing[obj.pk] = obj
+    return existing
+
+
+def diff_rows(model, incoming, existing, report):
+    """Splits validated rows into new instances and changed instances, counting unchanged ones."""
+    to_create, to_update, changed_fields = [], [], set()
+    for key, data in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            to_create.append(model(**data))
+            continue
+        changed = [name for name, value in data.items() if getattr(current, name) != value]
+        if not changed:
+            report.unchanged += 1
+            continue
+        for name in changed:
+            setattr(current, name, data[name])
+        to_update.append(current)
+        changed_fields.update(changed)
+    return to_create, to_update, changed_fields
+
+
+def write_rows(model, to_create, to_update, changed_fields, batch_size):
+    pk_name = model._meta.pk.name
+    if to_create:
+        # update_conflicts covers a row inserted by another process since we diffed.
+        model.objects.bulk_create(
+            to_create,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=[pk_name],
+            update_fields=[f.name for f in model._meta.concrete_fields if not f.primary_key],
+        )
+    if to_update:
+        model.objects.bulk_update(to_update, sorted(changed_fields), batch_size=batch_size)
+
+
+def delete_missing(scope, keep, batch_size):
+    """Deletes the rows of ``scope`` whose primary key is not in ``keep``; returns their keys."""
+    stale = [key for key in scope.values_list('pk', flat=True) if key not in keep]
+    for start in range(0, len(stale), batch_size):
+        scope.model.objects.filter(pk__in=stale[start:start + batch_size]).delete()
+    return stale
+
+
+def fingerprint(row, fields):
+    """Returns a stable hash of ``row``'s values for ``fields`` as they came from the API."""
+    payload = json.dumps([row.get(name) for name in fields], default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def fingerprint_fields(model):
+    return [f.name for f in model._meta.concrete_fields if not f.primary_key and f.name != 'Fingerprint']
+
+
+def load_fingerprints(model, keys, batch_size):
+    keys = list(keys)
+    stored = {}
+    for start in range(0, len(keys), batch_size):
+        stored.update(
+            model.objects.filter(pk__in=keys[start:start + batch_size]).values_list('pk', 'Fingerprint')
+        )
+    return stored
+
+
+def ingest(model, serializer_class, rows, batch_size=None, scope=None, keep=(), fingerprints=None,
+           started=None, after_write=None):
+    """
+    Validates ``rows`` and applies them in one transaction.
+
+    With ``scope`` (a queryset of ``model``), rows of the scope that are
+    neither in the payload nor in ``keep`` are deleted as part of the same
+    transaction. Keys in ``keep`` were seen unchanged by the caller and are
+    counted as such. ``fingerprints`` maps primary keys to the value stored in
+    the model's ``Fingerprint`` column. ``after_write(written, deleted)`` is
+    called in the transaction with the inserted and updated instances and the
+    deleted keys, to keep derived tables in step.
+    """
+    started = started or time.perf_counter()
+    batch_size = batch_size or batch_size_setting()
+    report = IngestReport(model._meta.db_table, unchanged=len(keep))
+    pk_name = model._meta.pk.name
+
+    valid, invalid = validate_payload(serializer_class, rows)
+    report.invalid = len(invalid)
+    report.errors = invalid
+    # If the payload repeats a key, the last occurrence wins.
+    incoming = {data[pk_name]: data for data in valid}
+    if fingerprints:
+        for key, data in incoming.items():
+            data['Fingerprint'] = fingerprints.get(key)
+
+    with transaction.atomic():
+        existing = load_existing(model.objects.all(), incoming.keys(), batch_size)
+        to_create, to_update, changed_fields = diff_rows(model, incoming, existing, report)
+        write_rows(model, to_create, to_update, changed_fields, batch_size)
+        if scope is not None:
+            # A row that failed validation is kept as it was rather than dropped.
+            keep = set(incoming) | set(keep) | {key for key, _ in invalid}
+            deleted = delete_missing(scope, keep, batch_size)
+            report.deleted = len(deleted)
+        else:
+            deleted = []
+        if to_create or to_update or deleted:
+            # Invalidates cached API responses built from this table.
+            bump_versions(model)
+            if after_write is not None:
+                after_write(to_create + to_update, deleted)
+
+    report.inserted = len(to_create)
+    report.updated = len(to_update)
+    report.elapsed = time.perf_counter() - started
+    for key, errors in invalid:
+        logger.warning(f"Invalid data for {model.__name__} {key}: {errors}")
+    logger.info(str(report))
+    for reports in _collectors:
+        reports.append(report)
+    return report
+
+
+def bulk_upsert(model, serializer_class, rows, batch_size=None):
+    """
+    Inserts new rows and updates changed ones in a single transaction.
+
+    Fields missing from a row keep their stored value, like the
+    ``update_or_create(defaults=...)`` calls this replaces.
+    """
+    return ingest(model, serializer_class, rows, batch_size)
+
+
+def replace_rows(model, serializer_class, rows, scope=None, batch_size=None):
+    """
+    Makes ``scope`` (default: the whole table) hold exactly ``rows``.
+
+    Only changed rows are written and only vanished rows are deleted, all in
+    one transaction, instead of delete-all followed by a row-by-row reinsert.
+    """
+    if scope is None:
+        scope = model.objects.all()
+    return ingest(model, serializer_class, rows, batch_size, scope=scope)
+
+
+def sync_rows(model, serializer_class, rows, scope=None, batch_size=None, after_write=None):
+    """
+    Incremental version of :func:`replace_rows` for models with a ``Fingerprint`` column.
+
+    Each raw row is hashed and compared with the stored fingerprint, so rows
+    the API returned unchanged are neither validated nor written. Pass
+    ``scope=None`` for a partial listing (e.g. only recently updated
+    matches); nothing is deleted then. ``after_write`` is as for :func:`ingest`.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or batch_size_setting()
+    pk_name = model._meta.pk.name
+    fields = fingerprint_fields(model)
+
+    hashes = {row.get(pk_name): fingerprint(row, fields) for row in rows}
+    stored = load_fingerprints(model, hashes.keys(), batch_size)
+    changed = [row for row in rows if stored.get(row.get(pk_name)) != hashes[row.get(pk_name)]]
+    unchanged = set(hashes) - {row.get(pk_name) for row in changed}
+
+    return ingest(model, serializer_class, changed, batch_size,
+                  scope=scope, keep=unchanged, fingerprints=hashes, started=started, after_write=after_write)
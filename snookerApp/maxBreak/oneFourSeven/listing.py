@@ -0,0 +1,172 @@
+"""Opt-in keyset pagination and ``?fields=`` selection for the list endpoints.
+
+Both are opt-in so existing clients keep getting the same responses:
+
+* ``?cursor=`` or ``?page_size=`` switches a list to keyset pagination on
+  ``ID``: each page is ``WHERE ID > <last seen> ORDER BY ID LIMIT n``,
+  with no OFFSET scan and no ``COUNT(*)``. The response becomes
+  ``{"next", "previous", "results"}``, ``next`` holding the following
+  page's URL.
+* ``?fields=ID,ShortName`` limits the serialized keys and the selected
+  columns (``QuerySet.only()``) to the given fields.
+
+Views that set ``values_fast_path`` build unpaginated lists with
+``serializers.value_rows`` instead of instantiating the serializer per row.
+
+``?stream=1`` (a JSON array) or ``?stream=ndjson`` (one row per line)
+streams the whole list instead: the queryset is read with
+``iterator(chunk_size=STREAM_CHUNK_SIZE)`` and every chunk is encoded and
+sent as soon as it is fetched, so memory does not grow with the table.
+Under ASGI the chunks are fetched one at a time through ``sync_to_async``:
+Django would otherwise collect a sync iterator into a list before sending
+anything. The streamed array is byte for byte the unstreamed response. ``nulls=omit`` in
+the Accept header applies to streamed rows too; the columnar and
+MessagePack representations need the whole list, so asking for one with
+``?stream=`` is answered 406.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotAcceptable, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .renderers import ColumnarJSONRenderer, FastJSONRenderer, MessagePackRenderer
+from .serializers import iter_value_rows, value_rows
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Cursor pagination on ID, only when the request asks for it."""
+    ordering = 'ID'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+def selected_fields(request, serializer_class):
+    """Field names from ``?fields=``, checked against ``serializer_class``; None when not given."""
+    raw = request.query_params.get('fields')
+    if not raw:
+        return None
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    available = serializer_class().fields
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}."})
+    return names
+
+
+def only_fields(queryset, names, required=()):
+    """Restricts the SELECT to the model columns among ``names`` plus ``required`` (the pk is always loaded)."""
+    columns = {field.name for field in queryset.model._meta.concrete_fields}
+    return queryset.only(*[name for name in (*names, *required) if name in columns])
+
+
+def restrict_fields(serializer, names):
+    """Drops every field not in ``names`` from a (list) serializer."""
+    target = getattr(serializer, 'child', serializer)
+    for name in set(target.fields) - set(names):
+        target.fields.pop(name)
+    return serializer
+
+
+def served_over_asgi(request):
+    """True when ``request`` (a Django or DRF request) came in through the ASGI handler."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def stream_format(request):
+    """
+    'json' for ?stream=1, 'ndjson' for ?stream=ndjson, None when no stream was asked for.
+    Raises NotAcceptable when the negotiated representation cannot be streamed.
+    """
+    value = request.query_params.get('stream', '').lower()
+    if value in ('', '0', 'false', 'no'):
+        return None
+    renderer = getattr(request, 'accepted_renderer', None)
+    if isinstance(renderer, (ColumnarJSONRenderer, MessagePackRenderer)):
+        raise NotAcceptable(f"?stream= is not available in the {renderer.format} format.")
+    return 'ndjson' if value == 'ndjson' else 'json'
+
+
+def stream_chunks(queryset, serializer_class, fields, ndjson, chunk_size, accepted_media_type=None):
+    renderer = FastJSONRenderer()
+    rows = iter_value_rows(queryset, serializer_class, fields, chunk_size)
+    if not ndjson:
+        yield b'['
+    first = True
+    while chunk := list(islice(rows, chunk_size)):
+        if ndjson:
+            yield b''.join(renderer.render(row, accepted_media_type) + b'\n' for row in chunk)
+        else:
+            # Rendering the chunk as a list and dropping its brackets keeps the array's exact bytes.
+            body = renderer.render(chunk, accepted_media_type)[1:-1]
+            yield body if first else b',' + body
+            first = False
+    if not ndjson:
+        yield b']'
+
+
+async def async_chunks(chunks):
+    """Yields the chunks of the generator ``chunks``, each produced in the sync thread, as it is ready."""
+    try:
+        while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def streaming_response(request, queryset, serializer_class, fields, stream):
+    """Streams ``queryset`` as ``stream`` ('json' or 'ndjson'); ``serializer_class`` as for value_rows()."""
+    chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+    ndjson = stream == 'ndjson'
+    accepted_media_type = getattr(request, 'accepted_media_type', None)
+    chunks = stream_chunks(queryset, serializer_class, fields, ndjson, chunk_size, accepted_media_type)
+    return StreamingHttpResponse(
+        async_chunks(chunks) if served_over_asgi(request) else chunks,
+        content_type='application/x-ndjson' if ndjson else 'application/json',
+    )
+
+
+class ListingMixin:
+    """``?fields=``, ``?stream=`` and opt-in cursor pagination for ``generics.ListAPIView`` subclasses."""
+    pagination_class = OptionalCursorPagination
+    # Serialize unpaginated lists from values_list() rows; same output, no per-row serializer work.
+    values_fast_path = False
+
+    def selected_fields(self):
+        if not hasattr(self, '_selected_fields'):
+            self._selected_fields = selected_fields(self.request, self.get_serializer_class())
+        return self._selected_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.selected_fields()
+        return only_fields(queryset, names) if names else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.selected_fields()
+        return restrict_fields(serializer, names) if names else serializer
+
+    def list(self, request, *args, **kwargs):
+        stream = stream_format(request)
+        if stream:
+            queryset = self.filter_queryset(self.get_queryset())
+            return streaming_response(request, queryset, self.get_serializer_class(), self.selected_fields(), stream)
+        if not self.values_fast_path:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(value_rows(queryset, self.get_serializer_class(), self.selected_fields()))
@@ -0,0 +1,182 @@
+"""Live score push over Server-Sent Events.
+
+Clients open ``live/`` (optionally ``?event=<id>,<id>``) with an
+``EventSource`` and keep the connection; they get a ``snapshot`` event with
+the current matches (of the tracked events, ``scraper.tracked_events``,
+unless they name events), then one ``match`` event per match whenever the
+scraper stores a change to it, and ``removed`` when a match disappears.
+
+Each server process runs one ``LiveHub``. While at least one client is
+connected, its poller reads the ``MatchesOfAnEvent`` data version every
+``LIVE_POLL_INTERVAL`` seconds (one indexed single-row query); only when
+the scraper has bumped it are the fingerprints of the tracked events'
+matches compared and the changed rows loaded; older events are no longer
+fetched, so their matches cannot change. Every change is encoded once and
+put on the queues of the subscribers that asked for its event, so an idle
+connection costs a bounded queue and a suspended coroutine, not a database
+query. A client too slow to drain ``LIVE_QUEUE_SIZE`` frames is
+disconnected and, like any EventSource, reconnects and starts again from a
+snapshot.
+
+The stream is an endless async generator and only works under the ASGI
+application (``maxBreak.asgi``, served by uvicorn; see there for the
+deployment). A WSGI server would try to collect the whole stream before
+sending the first byte, so the request would hang forever: over WSGI
+(runserver, ``maxBreak.wsgi``) the view answers 501 and points clients to
+the polled match lists instead.
+"""
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import table_name
+from .models import DataVersion, MatchesOfAnEvent
+from .renderers import FastJSONRenderer
+from .scraper import tracked_event_ids, tracked_events
+from .serializers import MatchesOfAnEventSerializer, value_rows
+
+logger = logging.getLogger(__name__)
+
+_renderer = FastJSONRenderer()
+
+
+def sse_frame(event, data, event_id=None):
+    """One Server-Sent Events message; compact JSON never contains a raw newline."""
+    frame = b''
+    if event_id is not None:
+        frame += f"id: {event_id}\n".encode()
+    return frame + f"event: {event}\ndata: ".encode() + _renderer.render(data) + b"\n\n"
+
+
+def current_version():
+    return DataVersion.objects.filter(Table=table_name(MatchesOfAnEvent)).values_list('Version', flat=True).first()
+
+
+def load_fingerprints(events):
+    """``{match ID: (Fingerprint, EventID)}`` for the stored matches of ``events``."""
+    matches = MatchesOfAnEvent.objects.filter(EventID__in=events)
+    return {pk: (fp, event_id) for pk, fp, event_id in matches.values_list('ID', 'Fingerprint', 'EventID')}
+
+
+def load_tracked_fingerprints():
+    """``(tracked event IDs, their matches' fingerprints)``."""
+    events = set(tracked_event_ids())
+    return events, load_fingerprints(events)
+
+
+def load_matches(ids=None, events=None):
+    matches = MatchesOfAnEvent.objects.order_by('ScheduledDate', 'ID')
+    if ids is not None:
+        matches = matches.filter(ID__in=ids)
+    if events is not None:
+        matches = matches.filter(EventID__in=events)
+    return value_rows(matches, MatchesOfAnEventSerializer)
+
+
+def load_snapshot(events=None):
+    """The matches a client starts from: of ``events``, of the tracked events when None."""
+    if events is None:
+        events = tracked_events().values('ID')
+    return load_matches(events=events)
+
+
+class Subscriber:
+    """One connected client: its event filter and a bounded queue of encoded frames."""
+
+    def __init__(self, events, size):
+        self.events = events
+        self.queue = asyncio.Queue(size)
+        self.dropped = False
+
+    def wants(self, event_id):
+        return self.events is None or event_id in self.events
+
+    def offer(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.dropped = True
+
+
+class LiveHub:
+    """In-process fan-out of match changes to every subscriber of this process."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.version = None
+        self.fingerprints = {}
+        self.task = None
+
+    def subscribe(self, events=None):
+        subscriber = Subscriber(events, getattr(settings, 'LIVE_QUEUE_SIZE', 256))
+        self.subscribers.add(subscriber)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.task = loop.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Live score poll failed")
+            await asyncio.sleep(getattr(settings, 'LIVE_POLL_INTERVAL', 2))
+        # Nobody listening: forget the baseline, the next poller starts from the data as it is then.
+        self.version = None
+        self.fingerprints = {}
+
+    async def poll(self):
+        """Publishes the matches that changed since the last poll; the first poll only records a baseline."""
+        version = await sync_to_async(current_version)()
+        if version == self.version:
+            return
+        events, fingerprints = await sync_to_async(load_tracked_fingerprints)()
+        baseline = self.version is None
+        previous, self.version, self.fingerprints = self.fingerprints, version, fingerprints
+        if baseline:
+            return
+        changed = [pk for pk, stored in fingerprints.items() if previous.get(pk) != stored]
+        # Matches of an event that is no longer tracked drop out of the fingerprints without being deleted.
+        removed = [(pk, event_id) for pk, (_, event_id) in previous.items()
+                   if pk not in fingerprints and event_id in events]
+        rows = await sync_to_async(load_matches)(changed) if changed else []
+        self.publish(rows, removed, version)
+
+    def publish(self, rows, removed, version):
+        frames = [(row['EventID'], sse_frame('match', row, version)) for row in rows]
+        frames += [(event_id, sse_frame('removed', {'ID': pk, 'EventID': event_id}, version))
+                   for pk, event_id in removed]
+        if frames:
+            logger.debug("Pushing %d match changes to %d subscribers", len(frames), len(self.subscribers))
+        for subscriber in list(self.subscribers):
+            for event_id, frame in frames:
+                if subscriber.wants(event_id):
+                    subscriber.offer(frame)
+
+
+hub = LiveHub()
+
+
+async def event_stream(events=None):
+    """One client's stream: snapshot, then changes, with keep-alive comments while idle."""
+    subscriber = hub.subscribe(events)
+    try:
+        version = await sync_to_async(current_version)()
+        rows = await sync_to_async(load_snapshot)(events)
+        yield b"retry: 5000\n\n" + sse_frame('snapshot', rows, version)
+        heartbeat = getattr(settings, 'LIVE_HEARTBEAT', 15)
+        while not subscriber.dropped:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield frame
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,273 @@
+"""Measures the latency of the REST endpoints on a seeded throw-away database.
+
+The database is seeded with ``benchmark.seed_database()`` (a full player
+list, several seasons of rankings, events and matches), then every route in
+``benchmark.ROUTES`` is measured in these sections:
+
+* ``test_client``: uncached requests through the Django test client, one
+  at a time, checked against each route's p95 budget;
+* ``load``: concurrent HTTP requests against a live server thread, which
+  may be answered from the response cache;
+* ``fast_path``: serializers and JSONRenderer against value_rows and
+  FastJSONRenderer on the same querysets (reported, no budget);
+* ``streaming``: peak memory of the ?stream= chunks of the match table
+  against the whole list rendered at once (reported, no budget);
+* ``payload_sizes``: bytes of the JSON, columnar and MessagePack
+  representations of a few lists (reported, no budget).
+
+p50/p95/p99 latency, throughput and queries per request are printed and
+written as JSON; the command fails when a route exceeds its budget.
+Query budgets are also checked by the test suite, latencies only here.
+"""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.test.testcases import LiveServerThread
+
+from rest_framework.renderers import JSONRenderer
+
+from oneFourSeven.benchmark import ROUTES, TOUR_DETAILS, count_queries, seed_database
+from oneFourSeven.listing import stream_chunks
+from oneFourSeven.models import Event, MatchesOfAnEvent, Player, Ranking
+from oneFourSeven.renderers import FastJSONRenderer, msgpack
+from oneFourSeven.serializers import (
+    EventSerializer, MatchesOfAnEventSerializer, PlayerSerializer, RankingSerializer, value_rows,
+)
+
+
+# Lists whose representations are compared in the payload_sizes section, and the Accept header of each one.
+PAYLOAD_PATHS = ('/oneFourSeven/events/', '/oneFourSeven/players/M/')
+PAYLOAD_FORMATS = {
+    'json': 'application/json',
+    'nulls=omit': 'application/json; nulls=omit',
+    'columnar': 'application/vnd.columnar+json',
+    'columnar; nulls=omit': 'application/vnd.columnar+json; nulls=omit',
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies_ms):
+    return {
+        'p50_ms': round(percentile(latencies_ms, 0.50), 2),
+        'p95_ms': round(percentile(latencies_ms, 0.95), 2),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 2),
+        'mean_ms': round(statistics.mean(latencies_ms), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = "Measures per-route latency and latency under concurrent load on a seeded test database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help="Multiplies the seeded volumes.")
+        parser.add_argument('--iterations', type=int, default=20, help="Uncached requests per route.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients in the load section.")
+        parser.add_argument('--latency-factor', type=float, default=1.0,
+                            help="Multiplies every latency budget, for slow machines.")
+        parser.add_argument('--skip-load', action='store_true', help="Only measure through the test client.")
+        parser.add_argument('--output', default='bench_api.json')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with mock.patch('oneFourSeven.views.get_tour_details', return_value=TOUR_DETAILS):
+                seed_database(options['scale'])
+                sections = {'test_client': self.measure_routes(options['iterations'])}
+                if not options['skip_load']:
+                    sections['load'] = self.measure_load(options['iterations'], options['concurrency'])
+                sections['fast_path'] = self.measure_fast_path(options['iterations'])
+                sections['streaming'] = self.measure_streaming()
+                sections['payload_sizes'] = self.measure_payload_sizes()
+        finally:
+            cache.clear()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'scale': options['scale'],
+                'iterations': options['iterations'],
+                'concurrency': options['concurrency'],
+            },
+            **sections,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+        failures = list(self.find_failures(sections, options['latency_factor'], options['concurrency']))
+        if failures:
+            raise CommandError("Over budget:\n" + "\n".join(failures))
+        self.stdout.write(self.style.SUCCESS("Every route within its budgets"))
+
+    def measure_routes(self, iterations):
+        # Not under the test runner, so 'testserver' is not an allowed host.
+        client, results = Client(HTTP_HOST='localhost'), {}
+        for name, (path, _queries, _budget) in ROUTES.items():
+            cache.clear()
+            response, queries = count_queries(client.get, path)
+            if response.status_code != 200:
+                raise CommandError(f"{name}: {path} answered {response.status_code}")
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(iterations):
+                cache.clear()
+                t = time.perf_counter()
+                client.get(path)
+                latencies.append((time.perf_counter() - t) * 1000)
+            elapsed = time.perf_counter() - started
+            results[name] = summarize(latencies)
+            results[name].update(queries=queries, throughput_rps=round(iterations / elapsed, 1))
+        self.print_table("Uncached latency per route (test client)", results)
+        return results
+
+    def measure_load(self, iterations, concurrency):
+        # The test database may be in memory: the server thread has to share this connection.
+        shared = connections[DEFAULT_DB_ALIAS]
+        shared.inc_thread_sharing()
+        server = LiveServerThread('localhost', StaticFilesHandler, {DEFAULT_DB_ALIAS: shared}, port=0)
+        server.daemon = True
+        server.start()
+        server.is_ready.wait()
+        if server.error:
+            raise server.error
+        base_url = f'http://localhost:{server.port}'
+
+        def fetch(path):
+            started = time.perf_counter()
+            with urllib.request.urlopen(base_url + path) as response:
+                response.read()
+                status = response.status
+            return status, (time.perf_counter() - started) * 1000
+
+        results, requests_per_route = {}, iterations * concurrency
+        try:
+            cache.clear()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                for name, (path, _queries, _budget) in ROUTES.items():
+                    started = time.perf_counter()
+                    outcomes = list(pool.map(fetch, [path] * requests_per_route))
+                    elapsed = time.perf_counter() - started
+                    statuses = {status for status, _ in outcomes}
+                    if statuses != {200}:
+                        raise CommandError(f"{name}: {path} answered {sorted(statuses)}")
+                    results[name] = summarize([latency for _, latency in outcomes])
+                    results[name]['throughput_rps'] = round(requests_per_route / elapsed, 1)
+        finally:
+            server.terminate()
+            shared.dec_thread_sharing()
+        self.print_table(f"Latency under load ({concurrency} concurrent clients)", results)
+        return results
+
+    def measure_fast_path(self, iterations):
+        cases = {
+            'events': (Event.objects.all(), EventSerializer),
+            'players': (Player.objects.filter(Sex='M'), PlayerSerializer),
+            'ranking': (Ranking.objects.all(), RankingSerializer),
+            'matches': (MatchesOfAnEvent.objects.all(), MatchesOfAnEventSerializer),
+        }
+        results = {}
+        for name, (queryset, serializer_class) in cases.items():
+            timings = {}
+            for label, build, renderer in (
+                ('serializer', lambda: serializer_class(queryset.all(), many=True).data, JSONRenderer()),
+                ('fast', lambda: value_rows(queryset.all(), serializer_class), FastJSONRenderer()),
+            ):
+                samples = []
+                for _ in range(max(3, iterations // 4)):
+                    started = time.perf_counter()
+                    renderer.render(build())
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[label] = statistics.median(samples)
+            results[name] = {
+                'rows': queryset.count(),
+                'serializer_ms': round(timings['serializer'], 2),
+                'fast_ms': round(timings['fast'], 2),
+                'speedup': round(timings['serializer'] / timings['fast'], 1),
+            }
+        self.stdout.write("Serializer + JSONRenderer vs value_rows + FastJSONRenderer (median)")
+        for name, r in results.items():
+            self.stdout.write(f"  {name:<10} {r['rows']:>6} rows  {r['serializer_ms']:>8.2f}ms -> "
+                              f"{r['fast_ms']:>7.2f}ms  x{r['speedup']}")
+        return results
+
+    def measure_streaming(self):
+        def peak_kb(function):
+            tracemalloc.start()
+            try:
+                function()
+                return tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+
+        def streamed():
+            chunk_size = getattr(settings, 'STREAM_CHUNK_SIZE', 2000)
+            for _ in stream_chunks(MatchesOfAnEvent.objects.all(), MatchesOfAnEventSerializer, None, False, chunk_size):
+                pass
+
+        def buffered():
+            FastJSONRenderer().render(value_rows(MatchesOfAnEvent.objects.all(), MatchesOfAnEventSerializer))
+
+        results = {
+            'rows': MatchesOfAnEvent.objects.count(),
+            'streamed_kb': round(peak_kb(streamed)),
+            'buffered_kb': round(peak_kb(buffered)),
+        }
+        self.stdout.write(f"Peak memory for {results['rows']} matches: streamed {results['streamed_kb']} KB, "
+                          f"buffered {results['buffered_kb']} KB")
+        return results
+
+    def measure_payload_sizes(self):
+        client, results = Client(HTTP_HOST='localhost'), {}
+        for path in PAYLOAD_PATHS:
+            sizes = {name: len(client.get(path, HTTP_ACCEPT=accept).content)
+                     for name, accept in PAYLOAD_FORMATS.items()}
+            if msgpack is not None:
+                sizes['msgpack'] = len(client.get(path + '?format=msgpack').content)
+            results[path] = sizes
+        self.stdout.write("Payload sizes in bytes")
+        for path, sizes in results.items():
+            self.stdout.write(f"  {path:<28} " + "  ".join(f"{name} {size}" for name, size in sizes.items()))
+        return results
+
+    def print_table(self, title, results):
+        self.stdout.write(title)
+        for name, r in results.items():
+            self.stdout.write(f"  {name:<24} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                              f"p99 {r['p99_ms']:>8.2f}ms  {r.get('queries', '-'):>3} queries  "
+                              f"{r['throughput_rps']:>8.1f} req/s")
+
+    def find_failures(self, sections, factor, concurrency):
+        """Yields a message for every route over its p95 budget."""
+        for name, result in sections['test_client'].items():
+            budget = ROUTES[name][2] * factor
+            if result['p95_ms'] > budget:
+                yield f"{name}: p95 {result['p95_ms']}ms (budget {budget}ms)"
+        # Concurrent requests queue behind each other, so allow a wider margin than uncached budgets.
+        for name, result in sections.get('load', {}).items():
+            budget = ROUTES[name][2] * concurrency * factor
+            if result['p95_ms'] > budget:
+                yield f"{name}: p95 {result['p95_ms']}ms under load (budget {budget}ms)"
@@ -0,0 +1,165 @@
+"""Benchmarks the scraper's ingest path against replayed or synthetic payloads.
+
+Each stage of populate_db's full and selective updates is run on a
+throw-away test database at every requested size, in three passes:
+
+* ``cold``: empty tables, every row is inserted;
+* ``rescan``: same payloads again with conditional fetching bypassed, so
+  rows are validated and diffed but nothing changed;
+* ``skip``: same payloads with conditional fetching on (the usual hourly run).
+
+For every stage and pass the wall time, number of queries, rows written and
+peak traced memory are recorded and written as JSON. ``--compare`` checks
+the results against an earlier file and fails on regressions.
+"""
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from oneFourSeven import scraper
+from oneFourSeven.client import reset_current_season, reset_session
+from oneFourSeven.ingest import collect_reports
+from oneFourSeven.replay import load_archive, save_archive, synthesize
+
+# (stage name, populate_db update it belongs to, scraper function)
+STAGES = [
+    ('season_events', 'full', scraper.get_season_events),
+    ('players_m', 'full', scraper.get_players_m),
+    ('players_w', 'full', scraper.get_players_w),
+    ('a_players_m', 'full', scraper.get_a_players_m),
+    ('ranking', 'full', scraper.get_ranking),
+    ('upcoming_matches', 'selective', scraper.get_upcoming_matches),
+    ('event_matches', 'selective', scraper.matches_of_an_event),
+]
+PASSES = [('cold', True), ('rescan', True), ('skip', False)]
+
+
+def measure(function, force):
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries, collect_reports() as reports, \
+                redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            function(force=force)
+            elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': round(elapsed, 4),
+        'queries': len(queries),
+        'rows_written': sum(r.written for r in reports),
+        'rows_unchanged': sum(r.unchanged for r in reports),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def result_key(result):
+    return (result['size'], result['pass'], result['stage'])
+
+
+def find_regressions(baseline, results, tolerance, min_seconds):
+    """Yields a message for every stage that got slower or issues more queries than in ``baseline``."""
+    previous = {result_key(r): r for r in baseline['results']}
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        label = "{size}/{pass}/{stage}".format(**result)
+        slower = result['seconds'] - old['seconds']
+        if slower > min_seconds and result['seconds'] > old['seconds'] * (1 + tolerance):
+            yield f"{label}: {old['seconds']}s -> {result['seconds']}s"
+        if result['queries'] > old['queries'] * (1 + tolerance):
+            yield f"{label}: {old['queries']} -> {result['queries']} queries"
+
+
+class Command(BaseCommand):
+    help = "Benchmarks populate_db's full and selective update stages on synthetic or replayed payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000,10000',
+                            help="Comma-separated player counts; each run uses half as many matches.")
+        parser.add_argument('--archive', help="Replay this recorded archive instead of synthetic payloads.")
+        parser.add_argument('--latency', type=float, default=0.0, help="Simulated API latency in seconds.")
+        parser.add_argument('--output', default='bench_ingest.json')
+        parser.add_argument('--compare', help="Earlier results file; exits with an error on regressions.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed relative slowdown / query growth before a stage counts as regressed.")
+        parser.add_argument('--min-seconds', type=float, default=0.05,
+                            help="Slowdowns below this many seconds are ignored as noise.")
+
+    def handle(self, *args, **options):
+        if options['archive']:
+            runs = [('recorded', load_archive(options['archive']))]
+        else:
+            sizes = [int(size) for size in options['sizes'].split(',') if size]
+            runs = [(size, synthesize(players=size, matches=size // 2)) for size in sizes]
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = []
+            for size, archive in runs:
+                results.extend(self.run_size(size, archive, options['latency']))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            reset_session()
+            reset_current_season()
+
+        report = {
+            'meta': {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'latency': options['latency'],
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = list(find_regressions(baseline, results, options['tolerance'], options['min_seconds']))
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
+
+    def run_size(self, size, archive, latency):
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        fd, path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(fd)
+        save_archive(path, archive)
+        try:
+            with override_settings(SNOOKER_API_MODE='replay', SNOOKER_API_ARCHIVE=path,
+                                   SNOOKER_API_REPLAY_LATENCY=latency):
+                reset_session()
+                reset_current_season()
+                for pass_name, force in PASSES:
+                    for stage, update, function in STAGES:
+                        result = {'size': size, 'pass': pass_name, 'stage': stage, 'update': update}
+                        result.update(measure(function, force))
+                        self.stdout.write(
+                            "{size:>8} {pass:<7} {stage:<17} {seconds:>8.3f}s {queries:>6} queries "
+                            "{rows_written:>7} written {peak_memory_kb:>10.1f} KB".format(**result)
+                        )
+                        yield result
+        finally:
+            os.remove(path)
@@ -0,0 +1,67 @@
+"""Prints the query plans of the API's hot queries before and after the index migration.
+
+A throw-away test database is migrated back to ``BEFORE_MIGRATION`` (the
+schema without the indexes added in 0011), every query in ``QUERIES`` is
+explained, then the database is migrated forward and the queries are
+explained again. ``--output`` writes both plans per query as JSON.
+"""
+import json
+from datetime import date
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from oneFourSeven.models import Event, MatchesOfAnEvent, Player, Ranking, UpcomingMatch
+from oneFourSeven.scraper import tracked_events
+
+BEFORE_MIGRATION = '0010_fetchstate'
+
+QUERIES = {
+    'players_by_sex': lambda: Player.objects.filter(Sex='M'),
+    'tracked_events': lambda: tracked_events(date.today()),
+    'season_calendar': lambda: Event.objects.filter(Season=2024).order_by('StartDate'),
+    'season_ranking': lambda: Ranking.objects.filter(Season=2024, Type='MoneyRankings').order_by('Position'),
+    'ranking_with_players': lambda: Ranking.objects.select_related('player')
+                                                   .filter(Season=2024, Type='MoneyRankings').order_by('Position'),
+    'event_matches': lambda: MatchesOfAnEvent.objects.filter(EventID=1).order_by('ScheduledDate'),
+    'curr_tour_matches': lambda: MatchesOfAnEvent.objects.order_by('ScheduledDate')[:20],
+    'player_matches': lambda: MatchesOfAnEvent.objects.filter(Q(Player1ID=5) | Q(Player2ID=5)),
+    'upcoming_with_names': lambda: UpcomingMatch.objects.select_related('player1', 'player2', 'event')
+                                                        .order_by('ScheduledDate'),
+}
+
+
+def explain_all():
+    return {name: build().explain().splitlines() for name, build in QUERIES.items()}
+
+
+class Command(BaseCommand):
+    help = "Shows query plans of the API's hot queries without and with the 0011 indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write the plans to this JSON file.")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            call_command('migrate', 'oneFourSeven', BEFORE_MIGRATION, verbosity=0)
+            before = explain_all()
+            call_command('migrate', 'oneFourSeven', verbosity=0)
+            after = explain_all()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        plans = {}
+        for name in QUERIES:
+            plans[name] = {'before': before[name], 'after': after[name]}
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label in ('before', 'after'):
+                for line in plans[name][label]:
+                    self.stdout.write(f"  {label:<6} {line}")
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(plans, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote query plans to {options['output']}"))
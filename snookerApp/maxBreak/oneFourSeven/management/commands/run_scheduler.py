@@ -0,0 +1,73 @@
+"""Runs the scraper feeds on their own intervals in one long-lived process.
+
+Replaces running populate_db.py from cron: Django, the HTTP session and the
+database connection are set up once, and live matches are refreshed every
+minute while they are being played instead of once an hour. See
+oneFourSeven/scheduler.py for the jobs and their intervals.
+
+``--status`` prints the status file written by a running scheduler.
+"""
+import json
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from oneFourSeven.scheduler import Scheduler, default_jobs
+
+
+class Command(BaseCommand):
+    help = "Runs the scraper feeds on per-feed intervals until stopped (SIGINT / SIGTERM)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', help="Comma-separated job names to run (default: all).")
+        parser.add_argument('--once', action='store_true', help="Run every job once and exit.")
+        parser.add_argument('--status-file', default=getattr(settings, 'SCHEDULER_STATUS_FILE', None),
+                            help="Where to write the last-run / next-run status (default: SCHEDULER_STATUS_FILE).")
+        parser.add_argument('--status', action='store_true',
+                            help="Print the status written by a running scheduler and exit.")
+
+    def handle(self, *args, **options):
+        status_file = options['status_file'] and str(options['status_file'])
+        if options['status']:
+            return self.print_status(status_file)
+
+        jobs = default_jobs()
+        if options['jobs']:
+            names = [name.strip() for name in options['jobs'].split(',') if name.strip()]
+            unknown = set(names) - {job.name for job in jobs}
+            if unknown:
+                raise CommandError(f"Unknown jobs: {', '.join(sorted(unknown))}")
+            jobs = [job for job in jobs if job.name in names]
+
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+        scheduler = Scheduler(jobs, status_file)
+        if options['once']:
+            scheduler.run_due()
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        self.stdout.write(f"Scheduler running {', '.join(job.name for job in jobs)}; status in {status_file}")
+        scheduler.run_forever(stop)
+        self.stdout.write("Scheduler stopped.")
+
+    def print_status(self, status_file):
+        if not status_file:
+            raise CommandError("No status file configured (SCHEDULER_STATUS_FILE).")
+        try:
+            with open(status_file) as f:
+                status = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"No status at {status_file}; is the scheduler running?")
+        self.stdout.write(f"Updated {status['updated']}, tracked events: {status['tracked_events']}, "
+                          f"with live matches: {status['live_events']}")
+        for name, job in status['jobs'].items():
+            outcome = f"failed ({job['last_error']})" if job['last_error'] else "ok"
+            self.stdout.write(f"{name:<17} last {job['last_run'] or '-':<32} {outcome:<6} next {job['next_run'] or '-'}")
+        budget = status['api_budget']
+        self.stdout.write(f"API budget: {budget['requests']} requests, {budget['waits']} waits, "
+                          f"{budget['wait_seconds']:.1f}s total wait")
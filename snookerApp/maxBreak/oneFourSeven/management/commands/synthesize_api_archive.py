@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from oneFourSeven.replay import load_archive, save_archive, synthesize
+
+
+class Command(BaseCommand):
+    help = "Writes a synthetic snooker.org API archive for SNOOKER_API_MODE=replay."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Path of the .json.gz archive to write.")
+        parser.add_argument('--players', type=int, default=1000)
+        parser.add_argument('--matches', type=int, default=500)
+        parser.add_argument('--events', type=int, default=40)
+        parser.add_argument('--season', type=int, default=None)
+        parser.add_argument('--template', help="Recorded archive whose rows are used as templates.")
+
+    def handle(self, *args, **options):
+        templates = load_archive(options['template']) if options['template'] else None
+        archive = synthesize(
+            players=options['players'],
+            matches=options['matches'],
+            events=options['events'],
+            season=options['season'],
+            template_archive=templates,
+        )
+        save_archive(options['output'], archive)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(archive)} payloads to {options['output']}"))
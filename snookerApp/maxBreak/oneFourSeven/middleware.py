@@ -0,0 +1,67 @@
+"""Response compression negotiated from Accept-Encoding: brotli, or gzip.
+
+brotli is optional; without the package every client that accepts gzip
+gets gzip, exactly as with Django's GZipMiddleware. Only GET and HEAD
+responses are compressed: POST responses carry login tokens, and leaving
+them uncompressed keeps secrets out of reach of compression side channels
+(BREACH) without affecting the read endpoints.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
+
+def brotli_sequence(sequence, quality):
+    """Compresses a streamed response chunk by chunk, flushing so every chunk is sent right away."""
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that prefers brotli when the client accepts ``br`` and the package is installed."""
+
+    def process_response(self, request, response):
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        # Server-Sent Events must reach the client frame by frame.
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        if brotli is None or response.streaming and response.is_async \
+                or not re_accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        # Same rules as GZipMiddleware: skip short responses and already encoded ones.
+        if not response.streaming and len(response.content) < 200:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        quality = getattr(settings, 'RESPONSE_BROTLI_QUALITY', 5)
+        if response.streaming:
+            response.streaming_content = brotli_sequence(response.streaming_content, quality)
+            del response.headers['Content-Length']
+        else:
+            compressed_content = brotli.compress(response.content, quality=quality)
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oneFourSeven', '0007_matchesofanevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchesofanevent',
+            name='Fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='upcomingmatch',
+            name='Fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+    ]
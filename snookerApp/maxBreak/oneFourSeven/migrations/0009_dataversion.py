@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oneFourSeven', '0008_match_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('Table', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('Version', models.IntegerField(default=0)),
+                ('Updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
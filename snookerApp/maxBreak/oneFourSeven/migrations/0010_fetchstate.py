@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oneFourSeven', '0009_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchState',
+            fields=[
+                ('Url', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('ContentHash', models.CharField(max_length=64)),
+                ('ETag', models.CharField(blank=True, max_length=255, null=True)),
+                ('LastModified', models.CharField(blank=True, max_length=64, null=True)),
+                ('Stored', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oneFourSeven', '0010_fetchstate'),
+    ]
+
+    operations = [
+        # The relations are virtual (no column), so they only change migration state;
+        # this also keeps the migration reversible on SQLite.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='matchesofanevent',
+                    name='event',
+                    field=models.ForeignObject(from_fields=['EventID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.event', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='matchesofanevent',
+                    name='player1',
+                    field=models.ForeignObject(from_fields=['Player1ID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.player', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='matchesofanevent',
+                    name='player2',
+                    field=models.ForeignObject(from_fields=['Player2ID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.player', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='ranking',
+                    name='player',
+                    field=models.ForeignObject(from_fields=['PlayerID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.player', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='upcomingmatch',
+                    name='event',
+                    field=models.ForeignObject(from_fields=['EventID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.event', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='upcomingmatch',
+                    name='player1',
+                    field=models.ForeignObject(from_fields=['Player1ID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.player', to_fields=['ID']),
+                ),
+                migrations.AddField(
+                    model_name='upcomingmatch',
+                    name='player2',
+                    field=models.ForeignObject(from_fields=['Player2ID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.player', to_fields=['ID']),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['StartDate', 'EndDate'], name='event_dates'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['Season', 'StartDate'], name='event_season_start'),
+        ),
+        migrations.AddIndex(
+            model_name='matchesofanevent',
+            index=models.Index(fields=['EventID', 'ScheduledDate'], name='event_matches_event_sched'),
+        ),
+        migrations.AddIndex(
+            model_name='matchesofanevent',
+            index=models.Index(fields=['ScheduledDate'], name='event_matches_sched'),
+        ),
+        migrations.AddIndex(
+            model_name='matchesofanevent',
+            index=models.Index(fields=['Player1ID'], name='event_matches_player1'),
+        ),
+        migrations.AddIndex(
+            model_name='matchesofanevent',
+            index=models.Index(fields=['Player2ID'], name='event_matches_player2'),
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['Sex'], name='player_sex'),
+        ),
+        migrations.AddIndex(
+            model_name='ranking',
+            index=models.Index(fields=['Season', 'Type', 'Position'], name='ranking_season_type_pos'),
+        ),
+        migrations.AddIndex(
+            model_name='ranking',
+            index=models.Index(fields=['PlayerID'], name='ranking_player'),
+        ),
+        migrations.AddIndex(
+            model_name='upcomingmatch',
+            index=models.Index(fields=['EventID', 'ScheduledDate'], name='upcoming_event_sched'),
+        ),
+        migrations.AddIndex(
+            model_name='upcomingmatch',
+            index=models.Index(fields=['ScheduledDate'], name='upcoming_sched'),
+        ),
+        migrations.AddIndex(
+            model_name='upcomingmatch',
+            index=models.Index(fields=['Player1ID'], name='upcoming_player1'),
+        ),
+        migrations.AddIndex(
+            model_name='upcomingmatch',
+            index=models.Index(fields=['Player2ID'], name='upcoming_player2'),
+        ),
+    ]
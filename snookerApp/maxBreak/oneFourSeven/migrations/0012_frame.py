@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:01
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# A frozen copy of oneFourSeven.frames' parser, so later changes to it do not change this migration.
+SIDE = re.compile(r'^\s*(\d+)\s*(?:\(\s*([\d\s,]*)\))?\s*$')
+
+
+def parse_side(text):
+    match = SIDE.match(text)
+    if match is None:
+        return None
+    return int(match.group(1)), [int(value) for value in re.findall(r'\d+', match.group(2) or '')]
+
+
+def parse_frame_scores(frame_scores):
+    frames = []
+    for number, text in enumerate((frame_scores or '').split(';'), start=1):
+        sides = text.split('-')
+        if len(sides) != 2:
+            continue
+        first, second = parse_side(sides[0]), parse_side(sides[1])
+        if first is None or second is None:
+            continue
+        frames.append((number, first[0], second[0], first[1], second[1]))
+    return frames
+
+
+def parse_stored_matches(apps, schema_editor):
+    """Frames for the matches stored before the scraper started writing them."""
+    MatchesOfAnEvent = apps.get_model('oneFourSeven', 'MatchesOfAnEvent')
+    Frame = apps.get_model('oneFourSeven', 'Frame')
+    frames = [
+        Frame(MatchID=match_id, Number=number, Points1=points1, Points2=points2,
+              Break1=max(breaks1, default=None), Break2=max(breaks2, default=None), Breaks1=breaks1, Breaks2=breaks2)
+        for match_id, frame_scores in MatchesOfAnEvent.objects.exclude(FrameScores=None).values_list('ID', 'FrameScores')
+        for number, points1, points2, breaks1, breaks2 in parse_frame_scores(frame_scores)
+    ]
+    Frame.objects.bulk_create(frames, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('oneFourSeven', '0011_indexes_and_relations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Frame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('MatchID', models.IntegerField()),
+                ('Number', models.IntegerField()),
+                ('Points1', models.IntegerField()),
+                ('Points2', models.IntegerField()),
+                ('Break1', models.IntegerField(blank=True, null=True)),
+                ('Break2', models.IntegerField(blank=True, null=True)),
+                ('Breaks1', models.JSONField(blank=True, default=list)),
+                ('Breaks2', models.JSONField(blank=True, default=list)),
+                ('match', models.ForeignObject(from_fields=['MatchID'], null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', serialize=False, to='oneFourSeven.matchesofanevent', to_fields=['ID'])),
+            ],
+            options={
+                'indexes': [models.Index(fields=['Points1'], name='frame_points1'), models.Index(fields=['Points2'], name='frame_points2'), models.Index(fields=['Break1'], name='frame_break1'), models.Index(fields=['Break2'], name='frame_break2')],
+                'constraints': [models.UniqueConstraint(fields=('MatchID', 'Number'), name='frame_match_number')],
+            },
+        ),
+        migrations.RunPython(parse_stored_matches, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,20 @@
 from django.db import models
 
+
+def virtual_relation(to, column):
+    """
+    Read-only relation over an existing integer ID column, for select_related / filtering.
+
+    It adds no column and no constraint: the API may reference players or
+    events we have not stored (yet), and such rows simply join to None.
+    serialize=False keeps it out of the ``fields = '__all__'`` serializers.
+    """
+    return models.ForeignObject(
+        to, on_delete=models.DO_NOTHING, from_fields=[column], to_fields=['ID'],
+        null=True, related_name='+', serialize=False,
+    )
+
+
 class Player(models.Model):
     ID = models.IntegerField(primary_key=True)
     Type = models.IntegerField(null=True, blank=True)
@@ -19,6 +34,11 @@ class Player(models.Model):
     NumRankingTitles = models.IntegerField(null= True,blank=True)
     NumMaximums = models.IntegerField(null= True,blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['Sex'], name='player_sex'),
+        ]
+
     def __str__(self):
         return f"{self.FirstName} {self.MiddleName} {self.LastName}"
 
@@ -29,6 +49,13 @@ class Ranking(models.Model):
     Season = models.IntegerField(null=True, blank=True)
     Sum = models.IntegerField(null=True, blank=True)
     Type = models.CharField(max_length=50, null=True, blank=True)
+    player = virtual_relation('Player', 'PlayerID')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['Season', 'Type', 'Position'], name='ranking_season_type_pos'),
+            models.Index(fields=['PlayerID'], name='ranking_player'),
+        ]
 
     def __str__(self):
         return f"Player {self.PlayerID} - Rank {self.Position} ({self.Season})"
@@ -74,6 +101,14 @@ class Event(models.Model):
     PreviousEdition = models.IntegerField(null=True, blank=True)
     Tour = models.CharField(max_length=50, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # scraper.tracked_events / live_matches: StartDate <= today, EndDate >= today - grace
+            models.Index(fields=['StartDate', 'EndDate'], name='event_dates'),
+            # season calendar, ordered by start date
+            models.Index(fields=['Season', 'StartDate'], name='event_season_start'),
+        ]
+
     def __str__(self):
         return self.Name
     
@@ -95,6 +130,19 @@ class UpcomingMatch(models.Model):
     OnBreak = models.BooleanField(blank=True,null=True)
     LiveUrl = models.URLField(null=True, blank=True)
     DetailsUrl = models.URLField(null=True, blank=True)
+    # Hash of the last API payload for this match; lets the scraper skip unchanged rows.
+    Fingerprint = models.CharField(max_length=40, null=True, blank=True, editable=False)
+    event = virtual_relation('Event', 'EventID')
+    player1 = virtual_relation('Player', 'Player1ID')
+    player2 = virtual_relation('Player', 'Player2ID')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['EventID', 'ScheduledDate'], name='upcoming_event_sched'),
+            models.Index(fields=['ScheduledDate'], name='upcoming_sched'),
+            models.Index(fields=['Player1ID'], name='upcoming_player1'),
+            models.Index(fields=['Player2ID'], name='upcoming_player2'),
+        ]
 
     def __str__(self):
         return f"Match {self.ID}"
@@ -114,8 +162,72 @@ class MatchesOfAnEvent(models.Model):
     OnBreak = models.BooleanField(blank=True,null=True)
     LiveUrl = models.URLField(null=True, blank=True)
     DetailsUrl = models.URLField(null=True, blank=True)
+    # Hash of the last API payload for this match; lets the scraper skip unchanged rows.
+    Fingerprint = models.CharField(max_length=40, null=True, blank=True, editable=False)
+    event = virtual_relation('Event', 'EventID')
+    player1 = virtual_relation('Player', 'Player1ID')
+    player2 = virtual_relation('Player', 'Player2ID')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['EventID', 'ScheduledDate'], name='event_matches_event_sched'),
+            models.Index(fields=['ScheduledDate'], name='event_matches_sched'),
+            models.Index(fields=['Player1ID'], name='event_matches_player1'),
+            models.Index(fields=['Player2ID'], name='event_matches_player2'),
+        ]
 
     def __str__(self):
         return f"Match {self.ID}"
     
-    
\ No newline at end of file
+    
+
+class Frame(models.Model):
+    """One frame of a match, parsed from its FrameScores when the scraper stores the match (frames.py)."""
+    MatchID = models.IntegerField()
+    Number = models.IntegerField()
+    Points1 = models.IntegerField()
+    Points2 = models.IntegerField()
+    # Each player's highest break of the frame, when the API lists one (breaks of 50+).
+    Break1 = models.IntegerField(null=True, blank=True)
+    Break2 = models.IntegerField(null=True, blank=True)
+    # Every break of 50+ of each player, in the order the API lists them.
+    Breaks1 = models.JSONField(default=list, blank=True)
+    Breaks2 = models.JSONField(default=list, blank=True)
+    match = virtual_relation('MatchesOfAnEvent', 'MatchID')
+
+    class Meta:
+        constraints = [
+            # also the index for a match's frames
+            models.UniqueConstraint(fields=['MatchID', 'Number'], name='frame_match_number'),
+        ]
+        indexes = [
+            models.Index(fields=['Points1'], name='frame_points1'),
+            models.Index(fields=['Points2'], name='frame_points2'),
+            models.Index(fields=['Break1'], name='frame_break1'),
+            models.Index(fields=['Break2'], name='frame_break2'),
+        ]
+
+    def __str__(self):
+        return f"Match {self.MatchID} frame {self.Number}"
+
+
+class DataVersion(models.Model):
+    """Per-table change counter, bumped by the scraper whenever it writes rows to that table."""
+    Table = models.CharField(max_length=100, primary_key=True)
+    Version = models.IntegerField(default=0)
+    Updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.Table} v{self.Version}"
+
+
+class FetchState(models.Model):
+    """Last payload the scraper stored for an API URL, used to skip unchanged responses."""
+    Url = models.CharField(max_length=255, primary_key=True)
+    ContentHash = models.CharField(max_length=64)
+    ETag = models.CharField(max_length=255, null=True, blank=True)
+    LastModified = models.CharField(max_length=64, null=True, blank=True)
+    Stored = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.Url
@@ -0,0 +1,126 @@
+"""Token-bucket rate limiter shared between processes.
+
+The bucket state lives in a small SQLite file, so cron runs, management
+commands and web requests that call the snooker.org API all draw from the
+same budget. Each ``acquire`` is a single ``BEGIN IMMEDIATE`` transaction
+that refills the bucket, reserves a token and returns how long the caller
+must sleep before using it.
+
+Background jobs wait as long as it takes. Web requests pass ``max_wait``:
+when the wait would be longer, nothing is reserved and ``RateLimited`` is
+raised, so a burst of requests cannot queue up reservations that stall
+the scraper behind them.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    waits INTEGER NOT NULL DEFAULT 0,
+    wait_seconds REAL NOT NULL DEFAULT 0,
+    max_wait REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class RateLimited(Exception):
+    """The caller would have had to wait longer than it allowed; ``retry_after`` is that wait in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"API rate limit: next token in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity`` (the burst size)."""
+
+    def __init__(self, path, name, rate, capacity):
+        self.path = str(path)
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, tokens=1, max_wait=None):
+        """
+        Takes ``tokens`` from the bucket and returns the seconds to wait before they are usable.
+        Raises RateLimited, taking nothing, when that wait would be longer than ``max_wait``.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated FROM bucket WHERE name = ?", (self.name,)
+            ).fetchone()
+            available = self.capacity if row is None else min(
+                self.capacity, row[0] + max(0.0, now - row[1]) * self.rate
+            )
+            # The balance may go negative: that is a reservation for a token
+            # that will only exist once the bucket has refilled.
+            available -= tokens
+            wait = max(0.0, -available / self.rate)
+            if max_wait is not None and wait > max_wait:
+                raise RateLimited(wait)
+            conn.execute(
+                """
+                INSERT INTO bucket (name, tokens, updated, requests, waits, wait_seconds, max_wait)
+                VALUES (?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    tokens = excluded.tokens,
+                    updated = excluded.updated,
+                    requests = requests + 1,
+                    waits = waits + excluded.waits,
+                    wait_seconds = wait_seconds + excluded.wait_seconds,
+                    max_wait = MAX(max_wait, excluded.max_wait)
+                """,
+                (self.name, available, now, int(wait > 0), wait, wait),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def acquire(self, tokens=1, max_wait=None):
+        """Blocks until ``tokens`` may be spent; returns the time spent waiting. See reserve() for ``max_wait``."""
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            logger.info(f"Waiting for {wait:.2f} seconds to respect API rate limit.")
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Returns the shared request count and wait-time metrics for this bucket."""
+        row = self._connection().execute(
+            "SELECT tokens, updated, requests, waits, wait_seconds, max_wait FROM bucket WHERE name = ?",
+            (self.name,),
+        ).fetchone()
+        if row is None:
+            return {'tokens': self.capacity, 'requests': 0, 'waits': 0,
+                    'wait_seconds': 0.0, 'max_wait': 0.0, 'avg_wait': 0.0}
+        tokens, updated, requests, waits, wait_seconds, max_wait = row
+        return {
+            'tokens': min(self.capacity, tokens + max(0.0, time.time() - updated) * self.rate),
+            'requests': requests,
+            'waits': waits,
+            'wait_seconds': wait_seconds,
+            'max_wait': max_wait,
+            'avg_wait': wait_seconds / requests if requests else 0.0,
+        }
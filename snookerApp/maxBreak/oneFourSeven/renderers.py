@@ -0,0 +1,117 @@
+"""Renderers for the API's JSON and compact representations.
+
+``FastJSONRenderer`` encodes with orjson when it is installed. orjson is
+optional: without it the renderer is DRF's ``JSONRenderer``. With it,
+compact responses (the API's default) come out byte for byte as
+``JSONRenderer`` would write them: UTF-8 rather than ``\\uXXXX`` escapes,
+no whitespace, U+2028/U+2029 escaped, int dict keys as strings, and any
+date, datetime, Decimal or UUID still left in the data formatted by DRF's
+own encoder. The one difference is float notation for very large or small
+values (orjson writes ``1e16`` where Python writes ``1e+16``); both parse
+to the same number. Indented output and anything orjson cannot encode
+(ints beyond 64 bits, lone surrogates) fall back to ``JSONRenderer``.
+
+Smaller payloads, chosen through the ``Accept`` header (or ``?format=``):
+
+* ``application/json; nulls=omit``: keys whose value is null are left out.
+* ``application/vnd.columnar+json`` (``?format=columnar``): a list of rows is
+  sent as ``{"columns": [...], "rows": [[...], ...]}``, so keys appear once
+  per response; with ``nulls=omit`` columns that are null in every row
+  are dropped.
+* ``application/msgpack`` (``?format=msgpack``): MessagePack, when the
+  optional msgpack package is installed.
+"""
+from django.utils.http import parse_header_parameters
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+def omits_nulls(accepted_media_type):
+    """True when the accepted media type carries ``nulls=omit``."""
+    if not accepted_media_type:
+        return False
+    _, params = parse_header_parameters(accepted_media_type)
+    return params.get('nulls') == 'omit'
+
+
+def omit_nulls(data):
+    """``data`` without the null-valued keys of its dicts, at any depth."""
+    if isinstance(data, dict):
+        return {key: omit_nulls(value) for key, value in data.items() if value is not None}
+    if isinstance(data, list):
+        return [omit_nulls(value) for value in data]
+    return data
+
+
+def columnar(data, drop_null_columns=False):
+    """
+    ``{"columns": [...], "rows": [[...], ...]}`` for a list of dicts (or the
+    ``results`` of a paginated response); anything else is returned as is.
+    """
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return {**data, 'results': columnar(data['results'], drop_null_columns)}
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        return data
+    columns = list(dict.fromkeys(key for row in data for key in row))
+    if drop_null_columns:
+        columns = [column for column in columns if any(row.get(column) is not None for row in data)]
+    return {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in data]}
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def prepare(self, data, accepted_media_type):
+        """Hook for the representation actually encoded."""
+        return omit_nulls(data) if omits_nulls(accepted_media_type) else data
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is not None:
+            data = self.prepare(data, accepted_media_type)
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer: these are valid JSON but end a line in JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def prepare(self, data, accepted_media_type):
+        return columnar(data, drop_null_columns=omits_nulls(accepted_media_type))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Only listed in REST_FRAMEWORK's renderers when msgpack is installed (see settings.py)."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if omits_nulls(accepted_media_type):
+            data = omit_nulls(data)
+        # Dates, Decimals, UUIDs... are written as DRF's JSON encoder writes them.
+        return msgpack.packb(data, default=JSONEncoder().default)
@@ -0,0 +1,235 @@
+"""Record / replay of snooker.org API responses.
+
+With ``SNOOKER_API_MODE = 'record'`` every response the client receives is
+also written to the gzip-compressed archive at ``SNOOKER_API_ARCHIVE``.
+With ``'replay'`` the client never touches the network: requests are served
+from that archive by ``ReplaySession``, after ``SNOOKER_API_REPLAY_LATENCY``
+seconds, and are not charged to the rate limiter.
+
+``synthesize`` builds an archive of arbitrary size (e.g. 10k players, 5k
+matches) for the URLs the scraper requests, optionally using a recorded
+archive's rows as templates, so the whole ingest path can be benchmarked
+offline.
+"""
+import copy
+import gzip
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .client import API_BASE_URL
+
+# Response headers worth keeping; conditional fetching relies on the first two.
+KEPT_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+
+def load_archive(path):
+    """Returns ``{url: {'status', 'headers', 'body'}}``; an archive that does not exist yet is empty."""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_archive(path, entries):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+
+def make_response(url, status, body, headers=None):
+    """Builds a ``requests.Response`` without a network round-trip."""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response._content = body.encode('utf-8')
+    response.headers = CaseInsensitiveDict(headers or {'Content-Type': 'application/json'})
+    response.encoding = 'utf-8'
+    return response
+
+
+class RecordingSession:
+    """Wraps a real session and appends every response to the archive."""
+
+    def __init__(self, session, path):
+        self.session = session
+        self.path = path
+        self.headers = session.headers
+        self._lock = threading.Lock()
+        self._entries = load_archive(path)
+
+    def get(self, url, **kwargs):
+        response = self.session.get(url, **kwargs)
+        if response.status_code == 200:
+            with self._lock:
+                self._entries[url] = {
+                    'status': response.status_code,
+                    'headers': {k: response.headers[k] for k in KEPT_HEADERS if k in response.headers},
+                    'body': response.text,
+                }
+                save_archive(self.path, self._entries)
+        return response
+
+
+class ReplaySession:
+    """Serves archived responses; unknown URLs get a 404."""
+
+    def __init__(self, path, latency=0.0):
+        self.path = path
+        self.latency = latency
+        self.headers = {}
+        self.entries = load_archive(path)
+        self.requests = 0
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        entry = self.entries.get(url)
+        if entry is None:
+            return make_response(url, 404, '[]')
+        etag = entry['headers'].get('ETag')
+        if etag and headers and headers.get('If-None-Match') == etag:
+            return make_response(url, 304, '', entry['headers'])
+        return make_response(url, entry['status'], entry['body'], entry['headers'])
+
+
+class NoLimit:
+    """Stand-in limiter for replay mode, where no request reaches the API."""
+
+    def acquire(self, tokens=1, max_wait=None):
+        return 0.0
+
+    def stats(self):
+        return {'tokens': 0, 'requests': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait': 0.0, 'avg_wait': 0.0}
+
+
+# Row templates used when no recorded archive is given to ``synthesize``.
+PLAYER_TEMPLATE = {
+    'ID': 0, 'Type': 1, 'FirstName': 'First', 'MiddleName': '', 'LastName': 'Last', 'TeamName': '',
+    'TeamNumber': 0, 'TeamSeason': 0, 'ShortName': 'F Last', 'Nationality': 'England', 'Sex': 'M',
+    'BioPage': '', 'Born': '1990-01-01', 'Twitter': '', 'SurnameFirst': False, 'License': '',
+    'Club': '', 'URL': '', 'Photo': '', 'PhotoSource': '', 'FirstSeasonAsPro': 2010,
+    'LastSeasonAsPro': 0, 'Info': '', 'NumRankingTitles': 0, 'NumMaximums': 0,
+}
+EVENT_TEMPLATE = {
+    'ID': 0, 'Name': 'Event', 'StartDate': '2024-01-01', 'EndDate': '2024-01-07', 'Sponsor': '',
+    'Season': 2024, 'Type': 'Ranking', 'Num': 0, 'Venue': 'Venue', 'City': 'City', 'Country': 'England',
+    'Discipline': 'snooker', 'Main': 0, 'Sex': 'Both', 'AgeGroup': 'O', 'Url': '', 'Related': '',
+    'Stage': 'F', 'ValueType': 'MR', 'ShortName': '', 'WorldSnookerId': 0, 'RankingType': 'WR',
+    'EventPredictionID': 0, 'Team': False, 'Format': 1, 'Twitter': '', 'HashTag': '',
+    'ConversionRate': 1.0, 'AllRoundsAdded': False, 'PhotoURLs': '', 'NumCompetitors': 128,
+    'NumUpcoming': 0, 'NumActive': 0, 'NumResults': 0, 'Note': '', 'CommonNote': '',
+    'DefendingChampion': 0, 'PreviousEdition': 0, 'Tour': 'main',
+}
+RANKING_TEMPLATE = {'ID': 0, 'Position': 0, 'PlayerID': 0, 'Season': 2024, 'Sum': 0, 'Type': 'MoneyRankings'}
+MATCH_TEMPLATE = {
+    'ID': 0, 'EventID': 0, 'Round': 1, 'Number': 0, 'Player1ID': 0, 'Score1': 0, 'Walkover1': False,
+    'Player2ID': 0, 'Score2': 0, 'Walkover2': False, 'WinnerID': 0, 'Unfinished': False,
+    'OnBreak': False, 'Status': 0, 'WorldSnookerID': 0, 'LiveUrl': '', 'DetailsUrl': '',
+    'PointsDropped': False, 'ShowCommonNote': False, 'Estimated': False, 'Type': 1,
+    'TableNo': 0, 'VideoURL': '', 'InitDate': None, 'ModDate': None, 'StartDate': None,
+    'EndDate': None, 'ScheduledDate': None, 'FrameScores': '', 'Sessions': '', 'Note': '',
+    'ExtendedNote': '',
+}
+
+
+def _template(archive, marker, default):
+    """First row of the first archived payload whose URL contains ``marker``."""
+    for url, entry in archive.items():
+        if marker in url:
+            try:
+                rows = json.loads(entry['body'])
+            except ValueError:
+                continue
+            if rows and isinstance(rows, list) and isinstance(rows[0], dict):
+                return rows[0]
+    return default
+
+
+def _row(template, **values):
+    row = copy.deepcopy(template)
+    row.update(values)
+    return row
+
+
+def _iso(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def synthesize(players=1000, matches=500, events=40, season=None, template_archive=None, now=None):
+    """
+    Returns an archive (URL -> response entry) with the given payload sizes.
+
+    The event calendar spans the season with one event in progress at ``now``;
+    its t=6 listing holds ``matches`` matches, scheduled around ``now``, and
+    the t=14 listing holds the not-yet-started ones. Players are split between
+    the men's, women's and amateur lists, and every men's player is ranked.
+    """
+    now = now or datetime.now(dt_timezone.utc).replace(microsecond=0)
+    season = season or now.year
+    templates = template_archive or {}
+    player_t = _template(templates, 't=10', PLAYER_TEMPLATE)
+    event_t = _template(templates, 't=5', EVENT_TEMPLATE)
+    ranking_t = _template(templates, 't=11', RANKING_TEMPLATE)
+    match_t = _template(templates, 't=6', MATCH_TEMPLATE)
+
+    women = players // 10
+    amateurs = players // 10
+    men = players - women - amateurs
+    men_rows = [_row(player_t, ID=i, FirstName=f'First{i}', LastName=f'Last{i}', ShortName=f'F Last{i}', Sex='M')
+                for i in range(1, men + 1)]
+    women_rows = [_row(player_t, ID=i, FirstName=f'First{i}', LastName=f'Last{i}', ShortName=f'F Last{i}', Sex='F')
+                  for i in range(men + 1, men + women + 1)]
+    amateur_rows = [_row(player_t, ID=i, FirstName=f'First{i}', LastName=f'Last{i}', ShortName=f'F Last{i}',
+                         Sex='M', Type=2)
+                    for i in range(men + women + 1, players + 1)]
+    ranking_rows = [_row(ranking_t, ID=season * 100000 + p['ID'], Position=n, PlayerID=p['ID'], Season=season,
+                         Sum=max(0, 1000000 - n * 1000), Type='MoneyRankings')
+                    for n, p in enumerate(men_rows, start=1)]
+
+    events = max(events, 1)
+    today = now.date()
+    first_day = today - timedelta(days=7 * (events // 2))
+    event_rows = []
+    for n in range(events):
+        start = first_day + timedelta(days=7 * n)
+        event_rows.append(_row(
+            event_t, ID=1000 + n, Name=f'Synthetic Open {n}', Season=season, Tour='Ranking',
+            StartDate=start.isoformat(), EndDate=(start + timedelta(days=6)).isoformat(),
+        ))
+    active = next(e for e in event_rows
+                  if date.fromisoformat(e['StartDate']) <= today <= date.fromisoformat(e['EndDate']))
+
+    match_rows = []
+    for n in range(matches):
+        scheduled = now + timedelta(minutes=30 * (n - matches // 2))
+        started = scheduled <= now
+        match_rows.append(_row(
+            match_t, ID=500000 + n, EventID=active['ID'], Round=1 + n % 7, Number=n + 1,
+            Player1ID=1 + (2 * n) % max(men, 1), Player2ID=1 + (2 * n + 1) % max(men, 1),
+            Score1=(n % 5) if started else 0, Score2=(n % 3) if started else 0,
+            ScheduledDate=_iso(scheduled), OnBreak=False,
+            FrameScores='; '.join(f'{60 + f}-{30 + f}' for f in range(n % 5)) if started else '',
+        ))
+    upcoming_rows = [m for m in match_rows if m['ScheduledDate'] > _iso(now)]
+
+    def entry(rows):
+        return {'status': 200, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(rows)}
+
+    return {
+        f"{API_BASE_URL}?t=20": entry([{'CurrentSeason': season}]),
+        f"{API_BASE_URL}?t=5&s={season}&tr=main": entry(event_rows),
+        f"{API_BASE_URL}?t=10&st=p&s={season}&se=m": entry(men_rows),
+        f"{API_BASE_URL}?t=10&st=p&s={season}&se=f": entry(women_rows),
+        f"{API_BASE_URL}?t=10&st=a&s={season}&se=m": entry(amateur_rows),
+        f"{API_BASE_URL}?t=11&rt=MoneyRankings&s={season}": entry(ranking_rows),
+        f"{API_BASE_URL}?t=14&tr=main": entry(upcoming_rows),
+        # Every other event has an (empty) listing too, so a just-finished one still tracked is served.
+        **{f"{API_BASE_URL}?t=6&e={e['ID']}": entry([]) for e in event_rows},
+        f"{API_BASE_URL}?t=6&e={active['ID']}": entry(match_rows),
+    }
@@ -0,0 +1,215 @@
+"""Long-running scheduler for the scraper feeds (``manage.py run_scheduler``).
+
+One process boots Django once and keeps it, the HTTP session and the
+memoized season warm, running every feed on its own interval:
+
+==================  ===========================================  =================
+job                 does                                         default interval
+==================  ===========================================  =================
+events              season calendar (t=5)                        6 h
+live_matches        matches of the events with live matches      60s while matches
+                    updated since the last poll (incremental,    are live, else until
+                    t=17)                                        the next start
+event_matches       full match lists of the tracked events       30 min
+                    (t=6), fetched in parallel; picks up draws
+                    and schedule changes
+upcoming_matches    upcoming main-tour matches (t=14)            15 min
+ranking             money rankings (t=11)                        24 h
+players             men's, women's and amateur lists (t=10)      24 h
+==================  ===========================================  =================
+
+The defaults above are ``DEFAULT_INTERVALS``; ``SCHEDULER_INTERVALS``
+overrides them per job. Which matches are live is read from the stored
+schedule (``scraper.live_matches``); between sessions ``live_matches``
+sleeps until shortly before the next scheduled match, at most
+``SCHEDULER_IDLE_INTERVAL`` seconds, and fetches nothing. A failing job is
+retried after 1, 2, 4... minutes, never later than its interval. After
+every job the state of all jobs (last run, duration, error, next run) and
+the API budget are written to ``SCHEDULER_STATUS_FILE``.
+"""
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import scraper
+from .client import get_limiter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVALS = {
+    'live_matches': 60,
+    'event_matches': 30 * 60,
+    'upcoming_matches': 15 * 60,
+    'events': 6 * 60 * 60,
+    'ranking': 24 * 60 * 60,
+    'players': 24 * 60 * 60,
+}
+# An incremental update can only look this far back; older state gets a full refresh instead.
+MAX_INCREMENTAL_AGE = timedelta(hours=1)
+
+
+def interval_setting(name):
+    return getattr(settings, 'SCHEDULER_INTERVALS', {}).get(name, DEFAULT_INTERVALS[name])
+
+
+def live_matches_interval():
+    """The live interval while a match is live; otherwise the time until the next one is, within limits."""
+    live_interval = interval_setting('live_matches')
+    idle_interval = getattr(settings, 'SCHEDULER_IDLE_INTERVAL', 15 * 60)
+    if scraper.live_event_ids():
+        return live_interval
+    next_start = scraper.next_match_start()
+    if next_start is None:
+        return idle_interval
+    lead = getattr(settings, 'LIVE_MATCH_LEAD', 10 * 60)
+    until_live = (next_start - timezone.now()).total_seconds() - lead
+    return min(idle_interval, max(live_interval, until_live))
+
+
+@dataclass
+class JobState:
+    name: str
+    runs: int = 0
+    failures: int = 0
+    last_run: str = None
+    last_success: str = None
+    # Last successful run that stored data (jobs return None when there was nothing to fetch).
+    last_stored: str = None
+    last_duration: float = None
+    last_error: str = None
+    interval: float = None
+    next_run: str = None
+
+
+@dataclass
+class Job:
+    name: str
+    function: object
+    interval: object
+    state: JobState = field(default=None)
+
+    def __post_init__(self):
+        self.state = self.state or JobState(self.name)
+
+
+def refresh_live_matches(state):
+    event_ids = scraper.live_event_ids()
+    if not event_ids:
+        return None
+    last_stored = state.last_stored and datetime.fromisoformat(state.last_stored)
+    if last_stored and timezone.now() - last_stored < MAX_INCREMENTAL_AGE:
+        return scraper.matches_of_an_event(since=last_stored, event_ids=event_ids)
+    return scraper.matches_of_an_event(event_ids=event_ids)
+
+
+def default_jobs():
+    # The calendar goes first, then full match lists: which matches are live is read from them.
+    return [
+        Job('events', lambda state: scraper.get_season_events(), lambda: interval_setting('events')),
+        Job('live_matches', refresh_live_matches, live_matches_interval),
+        Job('event_matches', lambda state: scraper.matches_of_an_event(), lambda: interval_setting('event_matches')),
+        Job('upcoming_matches', lambda state: scraper.get_upcoming_matches(),
+            lambda: interval_setting('upcoming_matches')),
+        Job('ranking', lambda state: scraper.get_ranking(), lambda: interval_setting('ranking')),
+        Job('players', lambda state: scraper.refresh_feeds(['players_m', 'players_w', 'a_players_m']),
+            lambda: interval_setting('players')),
+    ]
+
+
+class Scheduler:
+
+    def __init__(self, jobs, status_path=None):
+        self.jobs = jobs
+        self.status_path = status_path
+        self.finished = {}
+
+    def next_run(self, job):
+        """
+        When ``job`` is due: its interval after it last finished, the interval
+        read now so that matches going live or finishing move the live job
+        at once. None when it has never run.
+        """
+        if job.name not in self.finished:
+            return None
+        interval = job.interval()
+        if job.state.failures:
+            interval = min(interval, 60 * 2 ** (job.state.failures - 1))
+        job.state.interval = interval
+        next_run = self.finished[job.name] + timedelta(seconds=interval)
+        job.state.next_run = next_run.isoformat()
+        return next_run
+
+    def due(self, now):
+        return [job for job in self.jobs if (self.next_run(job) or now) <= now]
+
+    def run_job(self, job):
+        state = job.state
+        started, clock = timezone.now(), time.monotonic()
+        state.runs += 1
+        state.last_run = started.isoformat()
+        close_old_connections()
+        try:
+            result = job.function(state)
+        except Exception as e:
+            logger.exception("Job %s failed", job.name)
+            state.failures += 1
+            state.last_error = f"{type(e).__name__}: {e}"
+        else:
+            state.failures = 0
+            state.last_error = None
+            state.last_success = started.isoformat()
+            if result is not None:
+                state.last_stored = started.isoformat()
+        finally:
+            close_old_connections()
+        state.last_duration = round(time.monotonic() - clock, 3)
+        self.finished[job.name] = timezone.now()
+        self.next_run(job)
+        logger.info("Job %s %s in %.1fs, next run in %ds", job.name,
+                    "failed" if state.failures else "done", state.last_duration, state.interval)
+
+    def run_due(self, now=None):
+        """Runs every job that is due, in declaration order, and returns them."""
+        jobs = self.due(now or timezone.now())
+        for job in jobs:
+            self.run_job(job)
+            self.write_status()
+        return jobs
+
+    def seconds_until_next(self, now=None):
+        now = now or timezone.now()
+        runs = [self.next_run(job) for job in self.jobs]
+        if None in runs:
+            return 0
+        return max(0.0, (min(runs) - now).total_seconds())
+
+    def status(self):
+        return {
+            'updated': timezone.now().isoformat(),
+            'tracked_events': scraper.tracked_event_ids(),
+            'live_events': scraper.live_event_ids(),
+            'api_budget': get_limiter().stats(),
+            'jobs': {job.name: asdict(job.state) for job in self.jobs},
+        }
+
+    def write_status(self):
+        if not self.status_path:
+            return
+        temporary = f"{self.status_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.status(), f, indent=2)
+        os.replace(temporary, self.status_path)
+
+    def run_forever(self, stop):
+        """Runs jobs as they fall due until ``stop`` (a threading.Event) is set."""
+        while not stop.is_set():
+            self.run_due()
+            # Wake up at least once a minute so newly stored schedules shorten the live interval promptly.
+            stop.wait(min(self.seconds_until_next(), 60))
@@ -1,93 +1,87 @@
-from datetime import datetime
-import requests
+import logging
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .client import (
+    API_BASE_URL, fetch_json, fetch_payload, fetch_payloads, get_current_season as _get_current_season,
+)
+from .frames import store_frames
+from .ingest import bulk_upsert, sync_rows
 from .models import Event, Player, Ranking, UpcomingMatch, MatchesOfAnEvent
-from .serializers import EventSerializer, MatchesOfAnEventSerializer, RankingSerializer, UpcomingMatchSerializer
+from .serializers import EventSerializer, MatchesOfAnEventSerializer, PlayerSerializer, RankingSerializer, UpcomingMatchSerializer
 
-API_BASE_URL = "https://api.snooker.org/"
-HEADERS = {"X-Requested-By": "FahimaApp128"}
+logger = logging.getLogger(__name__)
 
-def fetch_from_api(url):
+# OnBreak only counts for matches scheduled this recently, so a stale flag cannot keep an event live.
+ON_BREAK_MAX_AGE = timedelta(days=2)
+
+def fetch_from_api(url, max_wait=None):
     """Fetches data from the API with error handling."""
-    try:
-        response = requests.get(url, headers=HEADERS)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from {url}: {e}")
-        return None
+    return fetch_json(url, max_wait)
 
 def get_current_season():
-    """Fetches the current season number from the API (t=20)."""
-    url = f"{API_BASE_URL}?t=20"
-    season_data = fetch_from_api(url)
-    if season_data and season_data[0]:
-        return season_data[0]['CurrentSeason']
-    return None
+    """Fetches the current season number from the API (t=20), memoized per run."""
+    return _get_current_season()
 
-def save_events(events_data):
-    for event_data in events_data:
-        serializer = EventSerializer(data=event_data)
-        if serializer.is_valid():
-            Event.objects.update_or_create(
-                ID=event_data.get('ID'),
-                defaults=serializer.validated_data
-            )
-
-def save_upcoming_events(events_data):
-    for event_data in events_data:
-        serializer = UpcomingMatchSerializer(data=event_data)
-        if serializer.is_valid():
-            Event.objects.update_or_create(
-                ID=event_data.get('ID'),
-                defaults=serializer.validated_data
-            )
-
-def save_matches_of_an_event(events_data):
-    for event_data in events_data:
-        serializer = UpcomingMatchSerializer(data=event_data)
-        if serializer.is_valid():
-            Event.objects.update_or_create(
-                ID=event_data.get('ID'),
-                defaults=serializer.validated_data
-            )
-
-def save_players(players_data):
-    fields = [f.name for f in Player._meta.get_fields()]
-    for player_data in players_data:
-        filtered_data = {k: v for k, v in player_data.items() if k in fields and v is not None}
-        
-        born_value = filtered_data.get('Born')
-        if born_value == "":
-            filtered_data['Born'] = None
-        elif born_value:
-            try:
-                from datetime import datetime
-                filtered_data['Born'] = datetime.strptime(born_value, '%Y-%m-%d').date()
-            except ValueError:
-                filtered_data['Born'] = None
-        
-        Player.objects.update_or_create(
-            ID=player_data.get('ID'),
-            defaults=filtered_data
-        )
-
-def save_rankings(rankings_data):
-    for ranking_data in rankings_data:
-        serializer = RankingSerializer(data=ranking_data)
-        if serializer.is_valid():
-            Ranking.objects.update_or_create(
-                ID=ranking_data.get('ID'),
-                defaults=serializer.validated_data
-            )
-
-
-
-def get_season_events():
-    current_season = get_current_season()
-    if current_season is None:
-        return None
-    url = f"{API_BASE_URL}?t=5&s={current_season}&tr=main"
-    events_data = fetch_from_api(url)
+def save_events(events_data, batch_size=None):
+    return bulk_upsert(Event, EventSerializer, events_data, batch_size)
+
+def save_upcoming_events(matches_data, batch_size=None):
+    """Atomically replaces the UpcomingMatch table with the t=14 listing, writing only changed matches."""
+    return sync_rows(UpcomingMatch, UpcomingMatchSerializer, matches_data,
+                     scope=UpcomingMatch.objects.all(), batch_size=batch_size)
+
+def save_matches_of_an_event(matches_data, batch_size=None, partial=False, event_id=None):
+    """
+    Atomically replaces the stored matches of ``event_id`` (the whole table when None) with the
+    t=6 listing, writing only changed matches; other events' matches are left alone.
+    With partial=True the payload holds only some matches (e.g. recently updated ones) and nothing is deleted.
+    """
+    if partial:
+        scope = None
+    elif event_id is None:
+        scope = MatchesOfAnEvent.objects.all()
+    else:
+        scope = MatchesOfAnEvent.objects.filter(EventID=event_id)
+    # Frames of the written matches are re-parsed in the same transaction.
+    return sync_rows(MatchesOfAnEvent, MatchesOfAnEventSerializer, matches_data,
+                     scope=scope, batch_size=batch_size, after_write=store_frames)
+
+def clean_player_data(player_data):
+    """Drops nulls (so they never overwrite stored values) and normalizes the birth date."""
+    cleaned = {k: v for k, v in player_data.items() if v is not None}
+    born_value = cleaned.get('Born')
+    if born_value == "":
+        cleaned['Born'] = None
+    elif born_value:
+        try:
+            datetime.strptime(born_value, '%Y-%m-%d')
+        except ValueError:
+            cleaned['Born'] = None
+    return cleaned
+
+def save_players(players_data, batch_size=None):
+    return bulk_upsert(Player, PlayerSerializer, [clean_player_data(p) for p in players_data], batch_size)
+
+def save_rankings(rankings_data, batch_size=None):
+    return bulk_upsert(Ranking, RankingSerializer, rankings_data, batch_size)
+
+
+
+def season_events_url(season):
+    return f"{API_BASE_URL}?t=5&s={season}&tr=main"
+
+def players_url(season, status, sex):
+    return f"{API_BASE_URL}?t=10&st={status}&s={season}&se={sex}"
+
+def ranking_url(season):
+    return f"{API_BASE_URL}?t=11&rt=MoneyRankings&s={season}"
+
+def upcoming_matches_url(season=None):
+    return f"{API_BASE_URL}?t=14&tr=main"
+
+def store_season_events(events_data, season):
     if events_data:
         filtered_events_data = [
             event for event in events_data
@@ -96,121 +90,205 @@ def get_season_events():
         ]
         save_events(filtered_events_data)
         # Sort events by start date
-        return Event.objects.filter(Season=current_season).order_by('StartDate')
+        return Event.objects.filter(Season=season).order_by('StartDate')
     return None
 
-def get_players_m():
-    current_season = get_current_season()
-    if current_season is None:
+def store_players(sex):
+    def store(players_data, season):
+        if players_data:
+            save_players(players_data)
+            return Player.objects.filter(Sex=sex)
         return None
-    url = f"{API_BASE_URL}?t=10&st=p&s={current_season}&se=m"
-    players_data = fetch_from_api(url)
-    if players_data:
-        save_players(players_data)
-        return Player.objects.filter(Sex='m')
+    return store
+
+def store_ranking(rankings_data, season):
+    if rankings_data:
+        save_rankings(rankings_data)
+        return Ranking.objects.filter(Season=season)
     return None
 
-def get_players_w():
-    current_season = get_current_season()
-    if current_season is None:
+def store_upcoming_matches(matches_data, season=None):
+    if matches_data:
+        save_upcoming_events(matches_data)
+        return UpcomingMatch.objects.all()
+    else:
+        logger.warning("No matches data fetched from API.")
         return None
-    url = f"{API_BASE_URL}?t=10&st=p&s={current_season}&se=f"
-    players_data = fetch_from_api(url)
-    if players_data:
-        save_players(players_data)
-        return Player.objects.filter(Sex='f')
-    return None
 
-def get_a_players_m():
-    current_season = get_current_season()
-    url = f"{API_BASE_URL}?t=10&st=a&s={current_season}&se=m"
-    players_data = fetch_from_api(url)
-    if players_data:
-        save_players(players_data)
-        return Player.objects.filter(Sex='m')
-    return None
+# Independent season feeds: name -> (url builder, store function, stored queryset).
+SEASON_FEEDS = {
+    'events': (season_events_url, store_season_events,
+               lambda season: Event.objects.filter(Season=season).order_by('StartDate')),
+    'players_m': (lambda season: players_url(season, 'p', 'm'), store_players('m'),
+                  lambda season: Player.objects.filter(Sex='m')),
+    'players_w': (lambda season: players_url(season, 'p', 'f'), store_players('f'),
+                  lambda season: Player.objects.filter(Sex='f')),
+    'a_players_m': (lambda season: players_url(season, 'a', 'm'), store_players('m'),
+                    lambda season: Player.objects.filter(Sex='m')),
+    'ranking': (ranking_url, store_ranking, lambda season: Ranking.objects.filter(Season=season)),
+    'upcoming_matches': (upcoming_matches_url, store_upcoming_matches,
+                         lambda season: UpcomingMatch.objects.all()),
+}
 
+def apply_payload(payload, store, stored, season=None):
+    """
+    Saves a conditionally fetched payload. An unchanged payload is not parsed or
+    written at all and the stored rows are returned instead.
+    """
+    if payload is None:
+        return store(None, season)
+    if not payload.changed:
+        logger.info(f"Unchanged since last run, skipped: {payload.url}")
+        return stored(season)
+    result = store(payload.data, season)
+    if result is not None:
+        payload.mark_stored()
+    return result
 
-def get_ranking():
+def _refresh_feed(name, force=False):
     current_season = get_current_season()
     if current_season is None:
         return None
-    url = f"{API_BASE_URL}?t=11&rt=MoneyRankings&s={current_season}"
-    rankings_data = fetch_from_api(url)
-    if rankings_data:
-        save_rankings(rankings_data)
-        return Ranking.objects.filter(Season=current_season)
-    return None
+    build_url, store, stored = SEASON_FEEDS[name]
+    payload = fetch_payload(build_url(current_season), force=force)
+    return apply_payload(payload, store, stored, current_season)
+
+def refresh_feeds(names=None, max_workers=None, force=False):
+    """
+    Fetches several independent feeds (t=5 / t=10 / t=11 / t=14) in parallel
+    and saves them one after another. Returns a dict of feed name -> queryset.
+    Feeds whose payload equals the last stored one are skipped unless ``force``.
+    """
+    names = list(names or SEASON_FEEDS)
+    current_season = get_current_season()
+    if current_season is None:
+        return {}
+    urls = [SEASON_FEEDS[name][0](current_season) for name in names]
+    payloads = fetch_payloads(urls, max_workers=max_workers, force=force)
+    # DB writes stay on this thread; only the HTTP round-trips run concurrently.
+    return {
+        name: apply_payload(payload, *SEASON_FEEDS[name][1:], current_season)
+        for name, payload in zip(names, payloads)
+    }
+
+def get_season_events(force=False):
+    return _refresh_feed('events', force)
+
+def get_players_m(force=False):
+    return _refresh_feed('players_m', force)
+
+def get_players_w(force=False):
+    return _refresh_feed('players_w', force)
+
+def get_a_players_m(force=False):
+    return _refresh_feed('a_players_m', force)
+
+
+def get_ranking(force=False):
+    return _refresh_feed('ranking', force)
 
 def get_player_by_id(player_id):
     """Fetches player details by ID (t=4) and saves/updates."""
     url = f"{API_BASE_URL}?p={player_id}"
     return fetch_from_api(url)
 
-def get_upcoming_matches():
+def get_upcoming_matches(force=False):
     """Fetches upcoming matches (t=14) for the main tour and replaces the existing table with new data from the API."""
-    url = f"{API_BASE_URL}?t=14&tr=main"
-    matches_data = fetch_from_api(url)
-    if matches_data:
-        # Delete all existing records
-        UpcomingMatch.objects.all().delete()
-        print("Existing matches deleted.")
-
-        # Insert new records from API
-        for match_data in matches_data:
-            serializer = UpcomingMatchSerializer(data=match_data)
-            if serializer.is_valid():
-                serializer.save()
-                print(f"Match {match_data.get('ID')} created.")
-            else:
-                print(f"Invalid data for match {match_data.get('ID')}: {serializer.errors}")
-        return UpcomingMatch.objects.all()
-    else:
-        print("No matches data fetched from API.")
-        return None
+    _, store, stored = SEASON_FEEDS['upcoming_matches']
+    return apply_payload(fetch_payload(upcoming_matches_url(), force=force), store, stored)
     
 
-def get_current_event():
+def tracked_events(day=None):
     """
-    מחזירה את ה-ID של הטורניר הפעיל, או None אם לא נמצא טורניר פעיל.
+    Events whose matches are still refreshed, several at once when they overlap: in progress on
+    ``day`` (today by default) or ended
+    less than EVENT_TRACKING_GRACE days before it, so results finished after midnight are picked up.
+    Matches of older events stay stored and are never fetched again.
     """
-    now = datetime.now()  # קבלת התאריך והשעה הנוכחיים
+    day = day or timezone.localdate()
+    grace = timedelta(days=getattr(settings, 'EVENT_TRACKING_GRACE', 1))
+    return Event.objects.filter(StartDate__lte=day, EndDate__gte=day - grace)
 
-    try:
-        # שאילתת דאטה בייס לקבלת טורניר פעיל
-        active_event = Event.objects.filter(
-            StartDate__lte=now,
-            EndDate__gte=now
-        ).first()
+def tracked_event_ids(day=None):
+    return list(tracked_events(day).order_by('ID').values_list('ID', flat=True))
 
-        if active_event:
-            return active_event.ID  # החזרת ה-ID של הטורניר הפעיל
-        else:
-            return None  # החזרת None אם לא נמצא טורניר פעיל
+def live_matches(now=None):
+    """
+    Stored matches that are, or are about to be, in progress: scheduled between
+    LIVE_MATCH_SPAN seconds ago and LIVE_MATCH_LEAD seconds from now, or on
+    a break between sessions (multi-session matches run past the span).
+    """
+    now = now or timezone.now()
+    lead = timedelta(seconds=getattr(settings, 'LIVE_MATCH_LEAD', 10 * 60))
+    span = timedelta(seconds=getattr(settings, 'LIVE_MATCH_SPAN', 5 * 60 * 60))
+    return MatchesOfAnEvent.objects.filter(
+        Q(ScheduledDate__range=(now - span, now + lead))
+        | Q(OnBreak=True, ScheduledDate__gte=now - ON_BREAK_MAX_AGE)
+    )
 
-    except Event.DoesNotExist:
-        return None  # החזרת None אם לא נמצא טורניר פעיל
-    
+def live_event_ids(now=None):
+    """IDs of the events with at least one live match."""
+    return sorted(set(live_matches(now).exclude(EventID=None).values_list('EventID', flat=True)))
 
-def matches_of_an_event():
-    event_id = get_current_event()
-    """fetch matches of an event"""
-    url = f"https://api.snooker.org/?t=6&e={event_id}"
-    matches = fetch_from_api(url)
-    if matches:
-        MatchesOfAnEvent.objects.all().delete()
-        for match in matches:
-            serializer = MatchesOfAnEventSerializer(data= match)
-            if serializer.is_valid():
-                serializer.save()
-            else:
-                print("Invalid serializer")
-        return MatchesOfAnEvent.objects.all()
-    else:
-        print("No matches")
+def next_match_start(now=None):
+    """Scheduled start of the next stored match that is not live yet, or None."""
+    now = now or timezone.now()
+    lead = timedelta(seconds=getattr(settings, 'LIVE_MATCH_LEAD', 10 * 60))
+    return (MatchesOfAnEvent.objects.filter(ScheduledDate__gt=now + lead)
+            .order_by('ScheduledDate').values_list('ScheduledDate', flat=True).first())
+
+def updated_matches_url(seconds):
+    """Matches updated in the last ``seconds`` (query type set by SNOOKER_API_UPDATED_MATCHES_TYPE)."""
+    query_type = getattr(settings, 'SNOOKER_API_UPDATED_MATCHES_TYPE', 17)
+    return f"{API_BASE_URL}?t={query_type}&ds={seconds}"
+
+def event_matches_url(event_id):
+    return f"{API_BASE_URL}?t=6&e={event_id}"
+
+def matches_of_an_event(since=None, force=False, event_ids=None, max_workers=None):
+    """
+    fetch matches of the events in ``event_ids`` (default: every tracked event), each event's
+    t=6 listing fetched in parallel and synced against that event's stored matches only.
+    With ``since`` (a datetime) only matches the API reports as updated since then are fetched and synced.
+    """
+    if event_ids is None:
+        event_ids = tracked_event_ids()
+    if not event_ids:
+        logger.info("No tracked event")
+        return None
+    if since is not None:
+        # A few seconds of overlap so a match updated during the previous poll is not missed.
+        seconds = int((timezone.now() - since).total_seconds()) + 5
+        updated = fetch_from_api(updated_matches_url(seconds))
+        if updated is None:
+            return None
+        matches = [match for match in updated if match.get('EventID') in event_ids]
+        save_matches_of_an_event(matches, partial=True)
+        return MatchesOfAnEvent.objects.filter(EventID__in=event_ids)
+
+    payloads = fetch_payloads([event_matches_url(event_id) for event_id in event_ids],
+                              max_workers=max_workers, force=force)
+    # DB writes stay on this thread; only the HTTP round-trips run concurrently.
+    stored = [
+        apply_payload(payload, store_matches_of_an_event(event_id),
+                      lambda season, event_id=event_id: MatchesOfAnEvent.objects.filter(EventID=event_id))
+        for event_id, payload in zip(event_ids, payloads)
+    ]
+    if all(result is None for result in stored):
         return None
+    return MatchesOfAnEvent.objects.filter(EventID__in=event_ids)
+
+def store_matches_of_an_event(event_id):
+    def store(matches, season=None):
+        if matches:
+            save_matches_of_an_event(matches, event_id=event_id)
+            return MatchesOfAnEvent.objects.filter(EventID=event_id)
+        else:
+            logger.info(f"No matches for event {event_id}")
+            return None
+    return store
     
-def get_tour_details(event_id):
-    """Fetches tour details by event ID (t=3)."""
+def get_tour_details(event_id, max_wait=None):
+    """Fetches tour details by event ID (t=3); ``max_wait`` as for fetch_json()."""
     url = f"{API_BASE_URL}?e={event_id}"
-    return fetch_from_api(url)
+    return fetch_from_api(url, max_wait)
@@ -1,9 +1,58 @@
+from rest_framework import fields as drf_fields
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from rest_framework import serializers
-from .models import Event, MatchesOfAnEvent, Ranking, Player, UpcomingMatch
-
+from .models import Event, Frame, MatchesOfAnEvent, Ranking, Player, UpcomingMatch
+
+
+# Fields whose to_representation() leaves a value read from the database unchanged.
+PASS_THROUGH_FIELDS = (drf_fields.IntegerField, drf_fields.CharField, drf_fields.BooleanField, drf_fields.FloatField)
+
+
+def value_rows(queryset, serializer_class, fields=None):
+    """
+    The rows ``serializer_class(queryset, many=True).data`` would give, built
+    from ``values_list()`` with no model instances and no per-row serializer.
+    Only dates and datetimes go through their field's to_representation().
+    See iter_value_rows() for the requirements on ``serializer_class``.
+    """
+    return list(iter_value_rows(queryset, serializer_class, fields))
+
+
+def iter_value_rows(queryset, serializer_class, fields=None, chunk_size=None):
+    """
+    Yields value_rows() one by one; with ``chunk_size`` the database rows are
+    fetched through ``iterator()`` that many at a time instead of all at once.
+
+    ``serializer_class`` must be a plain ModelSerializer: every field has to
+    be a column or annotation of ``queryset``, or (like EventSerializer's
+    active/past on an unannotated queryset) an attribute the model does not
+    have, which the serializer skips as well.
+    """
+    model = queryset.model
+    columns = {field.name for field in model._meta.concrete_fields} | set(queryset.query.annotations)
+    names, sources, convert = [], [], []
+    for name, field in serializer_class().fields.items():
+        if field.write_only or (fields and name not in fields):
+            continue
+        if field.source not in columns:
+            if field.source == '*' or '.' in field.source or hasattr(model, field.source):
+                raise ValueError(f"{serializer_class.__name__}.{name} is not a column of {model.__name__}.")
+            continue
+        if not isinstance(field, PASS_THROUGH_FIELDS):
+            convert.append((len(names), field.to_representation))
+        names.append(name)
+        sources.append(field.source)
+
+    values_list = queryset.values_list(*sources)
+    for values in values_list.iterator(chunk_size=chunk_size) if chunk_size else values_list:
+        if convert:
+            values = list(values)
+            for i, to_representation in convert:
+                if values[i] is not None:
+                    values[i] = to_representation(values[i])
+        yield dict(zip(names, values))
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -36,6 +85,13 @@ class EventSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+def player_name(player):
+    """ShortName, or the full name for players without one; None for an unknown player."""
+    if player is None:
+        return None
+    return player.ShortName or " ".join(filter(None, [player.FirstName, player.MiddleName, player.LastName]))
+
+
 class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
@@ -46,13 +102,67 @@ class RankingSerializer(serializers.ModelSerializer):
         model = Ranking
         fields = '__all__'
 
+class RankingWithPlayerSerializer(serializers.ModelSerializer):
+    """Compact ranking row with the player's name and nationality; expects select_related('player')."""
+    Name = serializers.SerializerMethodField()
+    Nationality = serializers.CharField(source='player.Nationality', read_only=True)
+
+    class Meta:
+        model = Ranking
+        fields = ('Position', 'PlayerID', 'Name', 'Nationality', 'Sum', 'Season', 'Type')
+
+    def get_Name(self, ranking):
+        return player_name(ranking.player)
+
 class UpcomingMatchSerializer(serializers.ModelSerializer):
     class Meta:
         model = UpcomingMatch
-        fields = '__all__'
+        exclude = ('Fingerprint',)
 
 class MatchesOfAnEventSerializer(serializers.ModelSerializer):
     class Meta:
         model = MatchesOfAnEvent
-        fields = '__all__'
+        exclude = ('Fingerprint',)
 
+class FrameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Frame
+        exclude = ('id',)
+
+
+
+def match_references(matches):
+    """
+    Loads the players and events referenced by ``matches`` in two queries, whatever
+    the number of matches. The result is the context of the expanded match serializers.
+    """
+    player_ids = {m.Player1ID for m in matches} | {m.Player2ID for m in matches}
+    event_ids = {m.EventID for m in matches}
+    players = Player.objects.filter(ID__in=player_ids).only('ID', 'ShortName', 'FirstName', 'MiddleName', 'LastName')
+    events = Event.objects.filter(ID__in=event_ids).only('ID', 'Name')
+    return {
+        'players': {player.ID: player for player in players},
+        'events': {event.ID: event for event in events},
+    }
+
+class ExpandedMatchFields(serializers.Serializer):
+    """Player names and event name of a match, looked up in the context built by match_references()."""
+    Player1Name = serializers.SerializerMethodField()
+    Player2Name = serializers.SerializerMethodField()
+    EventName = serializers.SerializerMethodField()
+
+    def get_Player1Name(self, match):
+        return player_name(self.context['players'].get(match.Player1ID))
+
+    def get_Player2Name(self, match):
+        return player_name(self.context['players'].get(match.Player2ID))
+
+    def get_EventName(self, match):
+        event = self.context['events'].get(match.EventID)
+        return event.Name if event else None
+
+class ExpandedUpcomingMatchSerializer(ExpandedMatchFields, UpcomingMatchSerializer):
+    pass
+
+class ExpandedMatchesOfAnEventSerializer(ExpandedMatchFields, MatchesOfAnEventSerializer):
+    pass
@@ -1,3 +1,892 @@
-from django.test import TestCase
+"""Tests for the oneFourSeven REST endpoints, renderers, scraper scheduling and live stream.
+
+Most classes run against the data set of ``benchmark.seed_database()``:
+every route in ``urls.py`` must stay within the query budget listed in
+``benchmark.ROUTES`` and be answered from the response cache, or with a
+304, without running its view. Latency and load are measured by
+``manage.py bench_api``, not here: wall-clock budgets do not belong in a
+suite that must pass on any machine.
+"""
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import URLPattern, URLResolver
+from rest_framework.renderers import JSONRenderer
+
+from . import client, live, scheduler, scraper, urls, views
+from .benchmark import (
+    LAST_SEASON_EVENTS, NOT_BENCHMARKED, ROUTES, TOUR_DETAILS, UNVERSIONED, count_queries, seed_database,
+)
+from .cache import bump_versions
+from .frames import parse_frame_scores
+from .ingest import bulk_upsert, collect_reports, replace_rows, sync_rows, validate_payload
+from .models import Event, FetchState, Frame, MatchesOfAnEvent, Player, Ranking, UpcomingMatch
+from .ratelimit import RateLimited, TokenBucket
+from .renderers import FastJSONRenderer, msgpack
+from .replay import NoLimit, RecordingSession, ReplaySession, load_archive, make_response, save_archive
+from .serializers import (
+    EventSerializer, MatchesOfAnEventSerializer, PlayerSerializer, RankingSerializer, UpcomingMatchSerializer,
+    value_rows,
+)
+
+
+def route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+@mock.patch('oneFourSeven.views.get_tour_details', return_value=TOUR_DETAILS)
+class ApiBenchmarkTests(TestCase):
+    """Queries per uncached request for every route, and cached / conditional requests that skip the view."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database()
+
+    def test_every_route_is_benchmarked(self, _):
+        missing = set(route_names(urls.urlpatterns)) - set(ROUTES) - NOT_BENCHMARKED
+        self.assertFalse(missing, f"Routes without a benchmark budget: {sorted(missing)}")
+
+    def test_query_budgets(self, _):
+        failures = []
+        for name, (path, max_queries, _budget) in ROUTES.items():
+            cache.clear()
+            response, queries = count_queries(self.client.get, path)
+            self.assertEqual(response.status_code, 200, f"{name}: {response.status_code}")
+            if queries > max_queries:
+                failures.append(f"{name}: {queries} queries (budget {max_queries})")
+        self.assertFalse(failures, "\n".join(failures))
+
+    def test_cached_and_conditional_requests_skip_the_view(self, _):
+        for name, (path, _max_queries, _budget) in ROUTES.items():
+            if name in UNVERSIONED:
+                continue
+            first = self.client.get(path)
+            _, queries = count_queries(self.client.get, path)
+            self.assertLessEqual(queries, 1, f"{name}: cached response ran {queries} queries")
+            response, queries = count_queries(self.client.get, path, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304, name)
+            self.assertLessEqual(queries, 1, f"{name}: 304 ran {queries} queries")
+
+    def test_calendar_season_must_be_an_ascii_number(self, _):
+        for season in ('x', '²', '٣'):
+            response = self.client.get('/oneFourSeven/events/calendar/', {'season': season})
+            self.assertEqual(response.status_code, 400, season)
+
+    def test_ranking_season_must_be_an_ascii_number(self, _):
+        for season in ('x', '²', '٣'):
+            response = self.client.get('/oneFourSeven/ranking/players/', {'season': season})
+            self.assertEqual(response.status_code, 400, season)
+
+
+# (model, serializer) pairs whose list output value_rows() reproduces.
+VALUE_ROW_SERIALIZERS = [
+    (Event, EventSerializer),
+    (Player, PlayerSerializer),
+    (Ranking, RankingSerializer),
+    (UpcomingMatch, UpcomingMatchSerializer),
+    (MatchesOfAnEvent, MatchesOfAnEventSerializer),
+]
+
+
+class FastPathTests(TestCase):
+    """values() rows and FastJSONRenderer must produce exactly the bytes of the serializer path."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database()
+
+    def assertSameBytes(self, expected, actual, label):
+        if expected != actual:
+            at = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+            self.fail(f"{label}: output differs at byte {at}: {expected[at - 40:at + 40]!r} != {actual[at - 40:at + 40]!r}")
+
+    def test_value_rows_match_serializer_output(self):
+        renderer = JSONRenderer()
+        querysets = [(model.objects.order_by('pk'), serializer) for model, serializer in VALUE_ROW_SERIALIZERS]
+        querysets.append((views.events_with_status(date.today()).order_by('pk'), EventSerializer))
+        for queryset, serializer_class in querysets:
+            expected = renderer.render(serializer_class(queryset, many=True).data)
+            self.assertSameBytes(expected, renderer.render(value_rows(queryset, serializer_class)),
+                                 serializer_class.__name__)
+        fields = ['ID', 'ShortName', 'Born']
+        serializer = PlayerSerializer(Player.objects.order_by('pk'), many=True)
+        expected = renderer.render(views.restrict_fields(serializer, fields).data)
+        self.assertSameBytes(expected, renderer.render(value_rows(Player.objects.order_by('pk'), PlayerSerializer, fields)),
+                             'PlayerSerializer fields')
+
+    def test_fast_renderer_matches_json_renderer(self):
+        samples = [serializer(model.objects.order_by('pk'), many=True).data
+                   for model, serializer in VALUE_ROW_SERIALIZERS]
+        samples.append({
+            'players': {5: {'ShortName': '丁俊晖\u2028'}}, 'missing': [7],
+            'when': datetime(2025, 4, 1, 13, 30, 15, 123456, tzinfo=dt_timezone.utc), 'day': date(2025, 4, 1),
+            'amount': Decimal('1.50'), 'id': uuid.UUID(int=1), 'rate': 0.1, 'empty': [], 'none': None,
+        })
+        for sample in samples:
+            self.assertSameBytes(JSONRenderer().render(sample), FastJSONRenderer().render(sample), 'renderer')
+
+    def test_fast_path_views_match_serializer_path(self):
+        paths = [ROUTES[name][0] for name in ('season_events', 'players', 'players?fields', 'ranking')]
+        for view in (views.EventList, views.PlayerList, views.RankingList):
+            self.assertTrue(view.values_fast_path, view.__name__)
+        for path in paths:
+            cache.clear()
+            fast = self.client.get(path).content
+            cache.clear()
+            with mock.patch.object(views.ListingMixin, 'values_fast_path', False), \
+                    mock.patch.object(views.EventList, 'values_fast_path', False), \
+                    mock.patch.object(views.PlayerList, 'values_fast_path', False), \
+                    mock.patch.object(views.RankingList, 'values_fast_path', False):
+                slow = self.client.get(path).content
+            self.assertSameBytes(slow, fast, path)
+
+
+class StreamingTests(TestCase):
+    """?stream= responses: same rows as the unstreamed lists, sent in chunks with flat memory."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database()
+        # Every event in progress, so the default match list (today's events) holds the whole table.
+        today = date.today()
+        Event.objects.update(StartDate=today - timedelta(days=1), EndDate=today + timedelta(days=1))
+
+    def consume(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        self.assertTrue(response.streaming, path)
+        chunks = list(response.streaming_content)
+        return response, chunks
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    def test_streamed_lists_match_unstreamed(self):
+        for path in ('/oneFourSeven/events/', '/oneFourSeven/players/M/?fields=ID,ShortName,Born',
+                     '/oneFourSeven/ranking/'):
+            cache.clear()
+            expected = self.client.get(path).content
+            separator = '&' if '?' in path else '?'
+            response, chunks = self.consume(path + separator + 'stream=1')
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertGreater(len(chunks), 3, path)
+            self.assertEqual(b''.join(chunks), expected, path)
+
+            response, chunks = self.consume(path + separator + 'stream=ndjson')
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = b''.join(chunks).splitlines()
+            self.assertEqual([json.loads(line) for line in lines], json.loads(expected), path)
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    async def test_streams_are_sent_chunk_by_chunk_over_asgi(self):
+        async def consume(path):
+            response = await self.async_client.get(path)
+            # An async iterator: a sync one would be collected into a list before the first byte went out.
+            self.assertTrue(response.is_async, path)
+            chunks = [chunk async for chunk in response.streaming_content]
+            self.assertGreater(len(chunks), 3, path)
+            return b''.join(chunks)
+
+        await sync_to_async(cache.clear)()
+        expected = (await self.async_client.get('/oneFourSeven/players/M/')).content
+        self.assertEqual(await consume('/oneFourSeven/players/M/?stream=1'), expected)
+        rows = json.loads(await consume('/oneFourSeven/curr_tour_matches/upcoming/?stream=1'))
+        self.assertEqual(len(rows), await MatchesOfAnEvent.objects.acount())
+
+    def test_streamed_matches(self):
+        _, chunks = self.consume('/oneFourSeven/curr_tour_matches/upcoming/?stream=1')
+        rows = json.loads(b''.join(chunks))
+        self.assertEqual(len(rows), MatchesOfAnEvent.objects.count())
+        self.assertEqual([row['ID'] for row in rows[:20]],
+                         [row['ID'] for row in self.client.get('/oneFourSeven/curr_tour_matches/upcoming/').json()])
+        response = self.client.get('/oneFourSeven/curr_tour_matches/upcoming/?stream=1&expand=1')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    def test_streams_follow_content_negotiation(self):
+        accept = 'application/json; nulls=omit'
+        expected = self.client.get('/oneFourSeven/players/M/', HTTP_ACCEPT=accept).content
+        self.assertNotIn(b'null', expected)
+        response = self.client.get('/oneFourSeven/players/M/?stream=1', HTTP_ACCEPT=accept)
+        self.assertEqual(b''.join(response.streaming_content), expected)
+        response = self.client.get('/oneFourSeven/curr_tour_matches/upcoming/?stream=ndjson', HTTP_ACCEPT=accept)
+        self.assertFalse([line for line in b''.join(response.streaming_content).splitlines() if b'null' in line])
+
+        formats = ['columnar'] + (['msgpack'] if msgpack else [])
+        for path in ('/oneFourSeven/players/M/', '/oneFourSeven/curr_tour_matches/upcoming/'):
+            for format in formats:
+                response = self.client.get(f'{path}?stream=1&format={format}')
+                self.assertEqual(response.status_code, 406, f'{path} {format}')
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    def test_streaming_memory_does_not_grow_with_the_table(self):
+        def peak_kb(function):
+            tracemalloc.start()
+            try:
+                function()
+                return tracemalloc.get_traced_memory()[1] / 1024
+            finally:
+                tracemalloc.stop()
+
+        def streamed():
+            for _ in self.client.get('/oneFourSeven/curr_tour_matches/upcoming/?stream=1').streaming_content:
+                pass
+
+        def buffered():
+            FastJSONRenderer().render(value_rows(MatchesOfAnEvent.objects.all(), MatchesOfAnEventSerializer))
+
+        # manage.py bench_api reports the figures.
+        self.assertLess(peak_kb(streamed), peak_kb(buffered) / 2)
+
+
+class CompactFormatTests(TestCase):
+    """Content negotiation of compact representations and compression."""
+
+    paths = ('/oneFourSeven/events/', '/oneFourSeven/players/M/')
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_database()
+
+    def test_compact_representations_hold_the_same_data(self):
+        sizes = {}
+        for path in self.paths:
+            rows = self.client.get(path).json()
+            sizes[path] = {'json': len(self.client.get(path).content)}
+
+            response = self.client.get(path, HTTP_ACCEPT='application/json; nulls=omit')
+            sizes[path]['nulls=omit'] = len(response.content)
+            self.assertEqual(response.json(), [{k: v for k, v in row.items() if v is not None} for row in rows])
+
+            for accept in ('application/vnd.columnar+json', 'application/vnd.columnar+json; nulls=omit'):
+                response = self.client.get(path, HTTP_ACCEPT=accept)
+                self.assertEqual(response['Content-Type'].split(';')[0], 'application/vnd.columnar+json')
+                sizes[path][accept.replace('application/vnd.', '')] = len(response.content)
+                table = json.loads(response.content)
+                rebuilt = [dict(zip(table['columns'], values)) for values in table['rows']]
+                self.assertEqual(rebuilt, [{k: row.get(k) for k in table['columns']} for row in rows], accept)
+                if 'nulls=omit' not in accept:
+                    self.assertEqual(rebuilt, rows)
+
+            if msgpack is not None:
+                response = self.client.get(path + '?format=msgpack')
+                sizes[path]['msgpack'] = len(response.content)
+                self.assertEqual(msgpack.unpackb(response.content), rows)
+
+        # manage.py bench_api reports the sizes.
+        for path, formats in sizes.items():
+            self.assertLess(formats['nulls=omit'], formats['json'], path)
+            self.assertLess(formats['columnar+json; nulls=omit'], formats['json'] / 2, path)
+
+    def test_gzip_and_conditional_requests(self):
+        for path in self.paths:
+            expected = self.client.get(path).content
+            response = self.client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(gzip.decompress(response.content), expected)
+            # The compressed response's weak ETag still validates.
+            response = self.client.get(path, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_post_responses_are_not_compressed(self):
+        response = self.client.post('/oneFourSeven/login/', {'username': 'nobody', 'password': 'x' * 500},
+                                    HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+def parse_sse(chunk):
+    """``[(event, data)]`` of the messages in a chunk of an event stream; comments are skipped."""
+    messages = []
+    for block in chunk.decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'event' in fields:
+            messages.append((fields['event'], json.loads(fields['data'])))
+    return messages
+
+
+def score_match(match_id, score1):
+    match = MatchesOfAnEvent.objects.get(ID=match_id)
+    match.Score1 = score1
+    match.Fingerprint = f'score-{score1}'
+    match.save()
+    bump_versions(MatchesOfAnEvent)
+
+
+@override_settings(LIVE_POLL_INTERVAL=0.01, LIVE_HEARTBEAT=0.05)
+class LiveScoreTests(TestCase):
+    """The SSE stream: snapshot on connect, then per-match deltas fanned out by event."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now, today = datetime.now(dt_timezone.utc), date.today()
+        for event_id in (1, 2):
+            Event.objects.create(ID=event_id, Name=f'Open {event_id}', StartDate=today, EndDate=today)
+        # Event 3 is over and no longer tracked: its match 7 is not part of the default snapshot or the deltas.
+        Event.objects.create(ID=3, Name='Old Open', StartDate=today - timedelta(days=9),
+                             EndDate=today - timedelta(days=5))
+        MatchesOfAnEvent.objects.bulk_create(
+            MatchesOfAnEvent(ID=n, EventID=1 + n % 2 if n < 7 else 3, Player1ID=n, Player2ID=n + 1, Score1=0,
+                             Score2=0, ScheduledDate=now, Fingerprint='start')
+            for n in range(1, 8)
+        )
+        bump_versions(MatchesOfAnEvent)
+
+    async def next_messages(self, stream):
+        return parse_sse(await asyncio.wait_for(stream.__anext__(), 5))
+
+    async def test_hub_fans_out_changes_by_event(self):
+        hub = live.LiveHub()
+        everything, event_1 = hub.subscribe(), hub.subscribe({1})
+        try:
+            await hub.poll()  # baseline
+            await sync_to_async(score_match)(2, 5)   # event 1
+            await sync_to_async(score_match)(3, 4)   # event 2
+            await sync_to_async(score_match)(7, 1)   # event 3, not tracked
+            await sync_to_async(MatchesOfAnEvent.objects.filter(ID=5).delete)()
+            await sync_to_async(bump_versions)(MatchesOfAnEvent)
+            await hub.poll()
+            await hub.poll()  # nothing changed since: no frames
+
+            frames = [everything.queue.get_nowait() for _ in range(everything.queue.qsize())]
+            messages = [m for frame in frames for m in parse_sse(frame)]
+            self.assertEqual(sorted((event, data['ID']) for event, data in messages),
+                             [('match', 2), ('match', 3), ('removed', 5)])
+            self.assertEqual(next(data for _, data in messages if data['ID'] == 2)['Score1'], 5)
+            frames = [event_1.queue.get_nowait() for _ in range(event_1.queue.qsize())]
+            self.assertEqual([data['ID'] for frame in frames for _, data in parse_sse(frame)], [2])
+        finally:
+            hub.unsubscribe(everything)
+            hub.unsubscribe(event_1)
+
+    async def test_slow_subscriber_is_dropped(self):
+        with override_settings(LIVE_QUEUE_SIZE=1):
+            hub = live.LiveHub()
+            subscriber = hub.subscribe()
+            hub.publish([{'ID': 1, 'EventID': 1}, {'ID': 2, 'EventID': 1}], [], 1)
+            hub.unsubscribe(subscriber)
+        self.assertTrue(subscriber.dropped)
+
+    async def test_stream_sends_snapshot_then_deltas(self):
+        response = await self.async_client.get('/oneFourSeven/live/?event=2')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            [(event, rows)] = await self.next_messages(stream)
+            self.assertEqual(event, 'snapshot')
+            self.assertEqual({row['ID'] for row in rows}, {1, 3, 5})
+
+            # Let the hub take its baseline, then change one match of each event.
+            await asyncio.sleep(0.05)
+            await sync_to_async(score_match)(3, 7)
+            await sync_to_async(score_match)(4, 7)
+            messages = []
+            while not messages:
+                messages = await self.next_messages(stream)
+            self.assertEqual([(event, data['ID'], data['Score1']) for event, data in messages], [('match', 3, 7)])
+        finally:
+            await stream.aclose()
+
+    async def test_default_snapshot_has_the_tracked_events(self):
+        stream = live.event_stream()
+        try:
+            [(event, rows)] = parse_sse(await asyncio.wait_for(stream.__anext__(), 5))
+        finally:
+            await stream.aclose()
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual({row['ID'] for row in rows}, {1, 2, 3, 4, 5, 6})
+
+    async def test_closed_stream_unsubscribes(self):
+        connected = len(live.hub.subscribers)
+        stream = live.event_stream({1})
+        await asyncio.wait_for(stream.__anext__(), 5)
+        self.assertEqual(len(live.hub.subscribers), connected + 1)
+        await stream.aclose()
+        self.assertEqual(len(live.hub.subscribers), connected)
+
+    def test_wsgi_requests_are_refused(self):
+        # Under WSGI the first byte of the endless stream would never be sent: answer at once instead.
+        response = self.client.get('/oneFourSeven/live/')
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+        self.assertIn('/oneFourSeven/curr_tour_matches/upcoming/', response.json()['error'])
+
+    async def test_invalid_event_filter(self):
+        response = await self.async_client.get('/oneFourSeven/live/?event=x')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(EVENT_FILTER_MAX_IDS=2):
+            response = await self.async_client.get('/oneFourSeven/live/?event=1,2,3')
+        self.assertEqual(response.status_code, 400)
+
+
+class PlayerBatchTests(TestCase):
+    """Validation of the IDs given to players_by_ids."""
+
+    url = '/oneFourSeven/players_by_ids/'
+
+    def test_ids_are_validated_before_the_query(self):
+        Player.objects.create(ID=1, FirstName='One')
+        response = self.client.post(self.url, {'ids': [1, '2', 1]}, content_type='application/json')
+        self.assertEqual(response.json(), {'players': {'1': mock.ANY}, 'missing': [2]})
+        for ids in (5, None, {'a': 1}, [1.9], [True], ['1x'], '1,-2'):
+            response = self.client.post(self.url, {'ids': ids}, content_type='application/json')
+            self.assertEqual(response.status_code, 400, ids)
+
+    @override_settings(PLAYER_BATCH_MAX_IDS=3)
+    def test_too_many_ids(self):
+        self.assertEqual(self.client.get(self.url + '?ids=1,2,3,3,3').status_code, 200)
+        response = self.client.get(self.url + '?ids=1,2,3,4,x')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'At most 3 player IDs per request.'})
+
+
+class SchedulerTests(TestCase):
+    """The scraper scheduler: per-job intervals, failure backoff, session-aware live interval, status file."""
+
+    def test_jobs_run_when_due_and_back_off_on_failure(self):
+        calls = []
+
+        def failing(state):
+            raise RuntimeError('API down')
+
+        jobs = [scheduler.Job('fast', calls.append, lambda: 60),
+                scheduler.Job('slow', calls.append, lambda: 3600),
+                scheduler.Job('broken', failing, lambda: 3600)]
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'status.json')
+        runner = scheduler.Scheduler(jobs, path)
+
+        with self.assertLogs('oneFourSeven.scheduler') as logs:
+            self.assertEqual([job.name for job in runner.run_due()], ['fast', 'slow', 'broken'])
+            self.assertEqual(runner.run_due(), [])
+            self.assertEqual(len(calls), 2)
+            self.assertAlmostEqual(runner.seconds_until_next(), 60, delta=5)
+
+            later = datetime.now(dt_timezone.utc) + timedelta(seconds=61)
+            self.assertEqual([job.name for job in runner.run_due(later)], ['fast', 'broken'])
+        self.assertIn('Job broken failed', logs.output[2])
+        broken = jobs[2].state
+        self.assertEqual((broken.runs, broken.failures, broken.interval), (2, 2, 120))
+
+        with open(path) as f:
+            status = json.load(f)
+        self.assertEqual(status['jobs']['fast']['runs'], 2)
+        self.assertEqual(status['jobs']['broken']['last_error'], 'RuntimeError: API down')
+        self.assertIsNone(status['jobs']['slow']['last_error'])
+        self.assertIn('requests', status['api_budget'])
+
+    @override_settings(SCHEDULER_INTERVALS={'live_matches': 30}, SCHEDULER_IDLE_INTERVAL=900,
+                       LIVE_MATCH_LEAD=600, LIVE_MATCH_SPAN=4 * 3600)
+    def test_live_interval_follows_the_schedule(self):
+        self.assertEqual(scheduler.live_matches_interval(), 900)
+        now = datetime.now(dt_timezone.utc)
+        match = MatchesOfAnEvent.objects.create(ID=1, EventID=7, ScheduledDate=now + timedelta(minutes=20))
+        # Next match goes live (10 minutes before its start) in about 10 minutes.
+        self.assertAlmostEqual(scheduler.live_matches_interval(), 600, delta=5)
+        match.ScheduledDate = now + timedelta(minutes=5)
+        match.save()
+        self.assertEqual(scheduler.live_matches_interval(), 30)
+
+
+class LiveMatchTests(TestCase):
+    """Which stored matches are live, and per-event storage of several concurrent events."""
+
+    @override_settings(LIVE_MATCH_LEAD=600, LIVE_MATCH_SPAN=4 * 3600)
+    def test_live_events_from_schedule_and_breaks(self):
+        now = datetime.now(dt_timezone.utc)
+        today = date.today()
+        for event_id in (1, 2, 3, 4):
+            Event.objects.create(ID=event_id, Name=f'Open {event_id}', StartDate=today - timedelta(days=1),
+                                 EndDate=today + timedelta(days=event_id))
+        MatchesOfAnEvent.objects.bulk_create([
+            MatchesOfAnEvent(ID=1, EventID=1, ScheduledDate=now - timedelta(hours=1), Score1=2, Score2=1),
+            MatchesOfAnEvent(ID=2, EventID=2, ScheduledDate=now + timedelta(minutes=5)),
+            MatchesOfAnEvent(ID=3, EventID=3, ScheduledDate=now - timedelta(hours=9), OnBreak=True),
+            MatchesOfAnEvent(ID=4, EventID=4, ScheduledDate=now - timedelta(hours=9), Score1=5, Score2=3),
+            MatchesOfAnEvent(ID=5, EventID=4, ScheduledDate=now + timedelta(hours=3)),
+            MatchesOfAnEvent(ID=6, EventID=5, ScheduledDate=now - timedelta(days=5), OnBreak=True),
+        ])
+        Event.objects.create(ID=5, Name='Old Open', StartDate=today - timedelta(days=9), EndDate=today - timedelta(days=2))
+        Event.objects.create(ID=6, Name='Last Open', StartDate=today - timedelta(days=9), EndDate=today - timedelta(days=1))
+        self.assertEqual(scraper.tracked_event_ids(), [1, 2, 3, 4, 6])
+        self.assertEqual(scraper.live_event_ids(now), [1, 2, 3])
+        self.assertEqual(scraper.next_match_start(now), now + timedelta(hours=3))
+
+    def test_event_matches_are_stored_per_event(self):
+        def match(match_id, event_id, score1=0):
+            return {'ID': match_id, 'EventID': event_id, 'Round': 1, 'Number': match_id, 'Player1ID': 1,
+                    'Score1': score1, 'Player2ID': 2, 'Score2': 0, 'ScheduledDate': None, 'FrameScores': '',
+                    'OnBreak': False, 'LiveUrl': None, 'DetailsUrl': None}
+
+        scraper.save_matches_of_an_event([match(1, 10), match(2, 10)], event_id=10)
+        scraper.save_matches_of_an_event([match(3, 20)], event_id=20)
+        scraper.save_matches_of_an_event([match(1, 10, score1=3)], event_id=10)
+        self.assertEqual(list(MatchesOfAnEvent.objects.order_by('ID').values_list('ID', 'EventID', 'Score1')),
+                         [(1, 10, 3), (3, 20, 0)])
+
+    def test_match_list_filters_by_event(self):
+        today = date.today()
+        Event.objects.create(ID=1, Name='Main', StartDate=today, EndDate=today + timedelta(days=3))
+        Event.objects.create(ID=2, Name='Qualifiers', StartDate=today, EndDate=today)
+        Event.objects.create(ID=3, Name='Last season', StartDate=date(2020, 1, 1), EndDate=date(2020, 1, 7))
+        MatchesOfAnEvent.objects.bulk_create(MatchesOfAnEvent(ID=n, EventID=1 + n % 3) for n in range(1, 10))
+
+        def ids(query=''):
+            return sorted(row['ID'] for row in self.client.get('/oneFourSeven/curr_tour_matches/upcoming/' + query).json())
+
+        self.assertEqual(ids(), [1, 3, 4, 6, 7, 9])
+        self.assertEqual(ids('?event=3'), [2, 5, 8])
+        self.assertEqual(ids('?event=2,3'), [1, 2, 4, 5, 7, 8])
+        response = self.client.get('/oneFourSeven/curr_tour_matches/upcoming/?event=main')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(EVENT_FILTER_MAX_IDS=2):
+            self.assertEqual(ids('?event=2,3,2'), [1, 2, 4, 5, 7, 8])
+            response = self.client.get('/oneFourSeven/curr_tour_matches/upcoming/?event=1,2,3')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'At most 2 event IDs per request.'})
+
+
+class FrameTests(TestCase):
+    """FrameScores parsing, frames kept in step with stored matches, and the frames endpoint."""
+
+    def test_parse_frame_scores(self):
+        self.assertEqual(parse_frame_scores('60-30; 0-124(124); 73(51)-14;131(52, 71)-0'), [
+            (1, 60, 30, [], []), (2, 0, 124, [], [124]), (3, 73, 14, [51], []), (4, 131, 0, [52, 71], []),
+        ])
+        # Unreadable frames are skipped, keeping the numbers of the others.
+        self.assertEqual(parse_frame_scores('12-70; n/a; 64-1'), [(1, 12, 70, [], []), (3, 64, 1, [], [])])
+        self.assertEqual(parse_frame_scores(''), [])
+        self.assertEqual(parse_frame_scores(None), [])
+
+    def test_frames_follow_ingested_matches(self):
+        def match(match_id, frame_scores):
+            return {'ID': match_id, 'EventID': 1, 'Round': 1, 'Number': match_id, 'Player1ID': 1, 'Score1': 0,
+                    'Player2ID': 2, 'Score2': 0, 'ScheduledDate': None, 'FrameScores': frame_scores,
+                    'OnBreak': False, 'LiveUrl': None, 'DetailsUrl': None}
+
+        def frames():
+            return list(Frame.objects.order_by('MatchID', 'Number').values_list('MatchID', 'Number', 'Points1', 'Points2'))
+
+        scraper.save_matches_of_an_event([match(1, '70-12'), match(2, '')], event_id=1)
+        self.assertEqual(frames(), [(1, 1, 70, 12)])
+        # A partial update re-parses the changed match only.
+        scraper.save_matches_of_an_event([match(2, '1-80(80); 131(60, 71)-0')], partial=True)
+        self.assertEqual(frames(), [(1, 1, 70, 12), (2, 1, 1, 80), (2, 2, 131, 0)])
+        # A match dropped from its event's listing takes its frames along.
+        scraper.save_matches_of_an_event([match(2, '1-80(80); 131(60, 71)-0')], event_id=1)
+        self.assertEqual(frames(), [(2, 1, 1, 80), (2, 2, 131, 0)])
+
+        self.assertEqual(Frame.objects.filter(Q(Points1__gt=100) | Q(Points2__gt=100)).count(), 1)
+        self.assertEqual(self.client.get('/oneFourSeven/matches/2/frames/').json(), [
+            {'MatchID': 2, 'Number': 1, 'Points1': 1, 'Points2': 80, 'Break1': None, 'Break2': 80,
+             'Breaks1': [], 'Breaks2': [80]},
+            {'MatchID': 2, 'Number': 2, 'Points1': 131, 'Points2': 0, 'Break1': 71, 'Break2': None,
+             'Breaks1': [60, 71], 'Breaks2': []},
+        ])
+        # Match 1 is gone; a stored match without frames has an empty list.
+        self.assertEqual(self.client.get('/oneFourSeven/matches/1/frames/').status_code, 404)
+        MatchesOfAnEvent.objects.create(ID=3, EventID=1)
+        bump_versions(MatchesOfAnEvent)
+        self.assertEqual(self.client.get('/oneFourSeven/matches/3/frames/').json(), [])
+
+
+class RateLimitTests(TestCase):
+    """The shared token bucket: background jobs wait their turn, web requests are refused instead."""
+
+    def setUp(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'ratelimit.sqlite3')
+        # A burst of 2, then one token a minute.
+        self.bucket = TokenBucket(path, 'test', rate=1 / 60, capacity=2)
+
+    def test_background_callers_wait_for_their_reservation(self):
+        with mock.patch('oneFourSeven.ratelimit.time.sleep') as sleep:
+            waits = [self.bucket.acquire() for _ in range(4)]
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        # The balance goes negative: every further caller waits a minute longer than the one before.
+        self.assertAlmostEqual(waits[2], 60, delta=1)
+        self.assertAlmostEqual(waits[3], 120, delta=1)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], waits[2:])
+
+    def test_interactive_callers_are_refused_without_reserving(self):
+        self.bucket.reserve()
+        self.bucket.reserve()
+        with self.assertRaises(RateLimited) as refused:
+            self.bucket.acquire(max_wait=2)
+        self.assertAlmostEqual(refused.exception.retry_after, 60, delta=1)
+        # Nothing was taken: the next background caller still waits one minute, not two.
+        self.assertEqual(self.bucket.stats()['requests'], 2)
+        self.assertAlmostEqual(self.bucket.reserve(), 60, delta=1)
+
+    def test_an_idle_bucket_refills_to_its_burst_capacity_only(self):
+        with mock.patch('oneFourSeven.ratelimit.time.time', return_value=1000.0) as clock:
+            self.assertEqual(self.bucket.stats()['tokens'], 2)
+            self.assertEqual([self.bucket.reserve() for _ in range(2)], [0.0, 0.0])
+            self.assertEqual(self.bucket.stats()['tokens'], 0)
+            # A day idle is worth two tokens, not 1440.
+            clock.return_value = 1000.0 + 24 * 60 * 60
+            self.assertEqual(self.bucket.stats()['tokens'], 2)
+            self.assertEqual([self.bucket.reserve() for _ in range(3)], [0.0, 0.0, 60.0])
+
+    def test_stats_are_shared_by_every_bucket_on_the_file(self):
+        other = TokenBucket(self.bucket.path, 'test', rate=1 / 60, capacity=2)
+        with mock.patch('oneFourSeven.ratelimit.time.time', return_value=1000.0):
+            self.bucket.reserve()
+            other.reserve()
+            self.bucket.reserve()
+            other.reserve()
+            stats = self.bucket.stats()
+            self.assertEqual(other.stats(), stats)
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['waits'], 2)
+        self.assertEqual(stats['wait_seconds'], 60.0 + 120.0)
+        self.assertEqual(stats['max_wait'], 120.0)
+        self.assertEqual(stats['avg_wait'], 45.0)
+        # Two reservations are owed: the balance is negative.
+        self.assertEqual(stats['tokens'], -2)
+
+    @override_settings(SNOOKER_API_INTERACTIVE_MAX_WAIT=2)
+    def test_tour_details_answer_503_when_the_budget_is_used_up(self):
+        self.bucket.reserve()
+        self.bucket.reserve()
+        with mock.patch('oneFourSeven.client.get_limiter', return_value=self.bucket), \
+                mock.patch('oneFourSeven.client.get_session') as session:
+            response = self.client.get('/oneFourSeven/tours/1000/')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(int(response['Retry-After']), (60, 61))
+        session.assert_not_called()
+
+
+class ClientTests(TestCase):
+    """The shared API client: memoized season lookup and parallel fetches."""
+
+    def setUp(self):
+        client.reset_current_season()
+        self.addCleanup(client.reset_current_season)
+
+    @override_settings(SNOOKER_SEASON_TTL=3600)
+    def test_current_season_is_memoized_for_its_ttl(self):
+        answers = [[{'CurrentSeason': 2024}], [{'CurrentSeason': 2025}], None]
+        with mock.patch('oneFourSeven.client.time.monotonic', return_value=1000.0) as clock, \
+                mock.patch('oneFourSeven.client.fetch_json', side_effect=answers) as fetch:
+            self.assertEqual(client.get_current_season(), 2024)
+            clock.return_value = 1000.0 + 3599
+            self.assertEqual(client.get_current_season(), 2024)
+            self.assertEqual(fetch.call_count, 1)
+            # Past the TTL the season is looked up again and a rollover picked up...
+            clock.return_value = 1000.0 + 3601
+            self.assertEqual(client.get_current_season(), 2025)
+            # ...and a failed lookup keeps the value it had.
+            self.assertEqual(client.get_current_season(refresh=True), 2025)
+            self.assertEqual(fetch.call_count, 3)
+
+    def test_fetch_many_keeps_the_order_of_the_urls(self):
+        urls = [f'https://api.test/?n={n}' for n in range(6)]
+
+        def fetch(url):
+            # The first URLs answer last.
+            n = int(url.rsplit('=', 1)[1])
+            time.sleep(0.01 * (len(urls) - n))
+            return {'n': n}
+
+        with mock.patch('oneFourSeven.client.fetch_json', side_effect=fetch):
+            self.assertEqual(client.fetch_many(urls, max_workers=6), [{'n': n} for n in range(6)])
+        self.assertEqual(client.fetch_many([]), [])
+
+
+    def replay(self, entries):
+        """Serves ``entries`` (URL -> archived response) to the client instead of the API."""
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'api.json.gz')
+        save_archive(path, entries)
+        session = ReplaySession(path)
+        self.enterContext(mock.patch('oneFourSeven.client.get_session', return_value=session))
+        self.enterContext(mock.patch('oneFourSeven.client.get_limiter', return_value=NoLimit()))
+        return session
+
+    def test_unchanged_payloads_are_skipped(self):
+        tagged, untagged = 'https://api.test/?t=14', 'https://api.test/?t=5'
+        session = self.replay({
+            tagged: {'status': 200, 'headers': {'ETag': '"v1"'}, 'body': '[{"ID": 1}]'},
+            untagged: {'status': 200, 'headers': {}, 'body': '[{"ID": 2}]'},
+        })
+        for url in (tagged, untagged):
+            payload = client.fetch_payload(url)
+            self.assertTrue(payload.changed)
+            payload.mark_stored()
+        self.assertEqual(FetchState.objects.get(Url=tagged).ETag, '"v1"')
+
+        with mock.patch.object(session, 'get', wraps=session.get) as get:
+            # The API answers 304 to the stored ETag...
+            self.assertFalse(client.fetch_payload(tagged).changed)
+            self.assertEqual(get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+            # ...and without one the body hashes to the stored payload.
+            self.assertFalse(client.fetch_payload(untagged).changed)
+        session.entries[untagged]['body'] = '[{"ID": 3}]'
+        self.assertEqual(client.fetch_payload(untagged).data, [{'ID': 3}])
+        self.assertEqual(client.fetch_payload(tagged, force=True).data, [{'ID': 1}])
+        with self.assertLogs('oneFourSeven.client', 'ERROR'):
+            self.assertIsNone(client.fetch_payload('https://api.test/?t=99'))
+
+    def test_fetch_state_is_written_only_once_the_payload_is_stored(self):
+        url = 'https://api.test/?t=14'
+        self.replay({url: {'status': 200, 'headers': {'ETag': '"v1"'}, 'body': '[{"ID": 1}]'}})
+
+        def fail(data, season):
+            raise RuntimeError('invalid payload')
+
+        with self.assertRaises(RuntimeError):
+            scraper.apply_payload(client.fetch_payload(url), fail, None)
+        # A store that saved nothing leaves the URL unrecorded too, so the next run fetches it again.
+        self.assertIsNone(scraper.apply_payload(client.fetch_payload(url), lambda data, season: None, None))
+        self.assertFalse(FetchState.objects.exists())
+
+        saved = []
+
+        def store(data, season):
+            saved.append(data)
+            return data
+
+        self.assertEqual(scraper.apply_payload(client.fetch_payload(url), store, None), [{'ID': 1}])
+        self.assertEqual(FetchState.objects.get(Url=url).ETag, '"v1"')
+        # Unchanged from now on: the stored rows are returned without calling store.
+        self.assertEqual(scraper.apply_payload(client.fetch_payload(url), store, lambda season: 'stored rows'),
+                         'stored rows')
+        self.assertEqual(saved, [[{'ID': 1}]])
+
+    def test_recorded_responses_are_replayed_offline(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'api.json.gz')
+        save_archive(path, {'https://api.test/?t=20': {'status': 200, 'headers': {}, 'body': '[]'}})
+        api = mock.Mock(headers={})
+        api.get.side_effect = [
+            make_response('https://api.test/?t=14', 200, '[{"ID": 1}]',
+                          {'ETag': '"v1"', 'Set-Cookie': 'id=1', 'Content-Type': 'application/json'}),
+            make_response('https://api.test/?t=5', 500, 'Server Error'),
+        ]
+        recorder = RecordingSession(api, path)
+        recorder.get('https://api.test/?t=14', timeout=30)
+        recorder.get('https://api.test/?t=5', timeout=30)
+        self.assertEqual(api.get.call_args.kwargs, {'timeout': 30})
+        # Successful responses are added to what the archive held; errors are not recorded.
+        archive = load_archive(path)
+        self.assertEqual(sorted(archive), ['https://api.test/?t=14', 'https://api.test/?t=20'])
+        self.assertEqual(archive['https://api.test/?t=14'], {
+            'status': 200, 'headers': {'ETag': '"v1"', 'Content-Type': 'application/json'}, 'body': '[{"ID": 1}]',
+        })
+
+        self.addCleanup(client.reset_session)
+        with override_settings(SNOOKER_API_MODE='replay', SNOOKER_API_ARCHIVE=path):
+            client.reset_session()
+            self.assertIsInstance(client.get_limiter(), NoLimit)
+            self.assertEqual(client.fetch_json('https://api.test/?t=14'), [{'ID': 1}])
+            with self.assertLogs('oneFourSeven.client', 'ERROR'):
+                self.assertIsNone(client.fetch_json('https://api.test/?t=5'))
+            replayed = client.get_session()
+        self.assertIsInstance(replayed, ReplaySession)
+        self.assertEqual(replayed.requests, 2)
+        self.assertEqual(replayed.get('https://api.test/?t=14', headers={'If-None-Match': '"v1"'}).status_code, 304)
+
+def match_row(match_id, event_id, score1=0):
+    return {'ID': match_id, 'EventID': event_id, 'Round': 1, 'Number': match_id, 'Player1ID': 1, 'Score1': score1,
+            'Player2ID': 2, 'Score2': 0, 'ScheduledDate': None, 'FrameScores': '', 'OnBreak': False,
+            'LiveUrl': None, 'DetailsUrl': None}
+
+
+def ranking(ranking_id, position, total=0):
+    return {'ID': ranking_id, 'Position': position, 'PlayerID': ranking_id, 'Season': 2024, 'Sum': total,
+            'Type': 'MoneyRankings'}
+
+
+class IngestTests(TestCase):
+    """Payloads written in one transaction: only new or changed rows, and only vanished rows deleted."""
+
+    def rankings(self):
+        return list(Ranking.objects.order_by('ID').values_list('ID', 'Position', 'Sum'))
+
+    def test_bulk_upsert_counts_what_it_writes(self):
+        with collect_reports() as reports, self.assertLogs('oneFourSeven.ingest', 'WARNING') as logs:
+            first = bulk_upsert(Ranking, RankingSerializer, [ranking(1, 1, 300), ranking(2, 2, 200), ranking(3, 3)])
+            second = bulk_upsert(Ranking, RankingSerializer, [
+                ranking(1, 1, 300), ranking(2, 2, 250), ranking(4, 4), {**ranking(5, 5), 'PlayerID': 'x'},
+            ])
+        self.assertEqual(reports, [first, second])
+        self.assertEqual((first.inserted, first.updated, first.unchanged, first.invalid), (3, 0, 0, 0))
+        self.assertEqual((second.inserted, second.updated, second.unchanged, second.deleted, second.invalid),
+                         (1, 1, 1, 0, 1))
+        self.assertEqual(second.written, 2)
+        self.assertEqual([key for key, _ in second.errors], [5])
+        self.assertIn('Invalid data for Ranking 5', logs.output[0])
+        self.assertRegex(str(second), r'^oneFourSeven_ranking: 1 inserted, 1 updated, 1 unchanged, '
+                                      r'0 deleted, 1 invalid in \d+\.\d{3}s$')
+        # An upsert never deletes: ranking 3, missing from the second payload, is still there.
+        self.assertEqual(self.rankings(), [(1, 1, 300), (2, 2, 250), (3, 3, 0), (4, 4, 0)])
+        # Once the block is left its list is no longer appended to.
+        with collect_reports() as later:
+            self.assertEqual(bulk_upsert(Ranking, RankingSerializer, [ranking(4, 4)]).written, 0)
+        self.assertEqual((len(reports), len(later)), (2, 1))
+
+    def test_replace_rows_deletes_the_vanished_rows_of_its_scope(self):
+        replace_rows(Ranking, RankingSerializer, [ranking(1, 1), ranking(2, 2), ranking(3, 3)])
+        Ranking.objects.create(**{**ranking(9, 1), 'Season': 2023})
+        report = replace_rows(Ranking, RankingSerializer, [ranking(1, 1), ranking(3, 2)],
+                              scope=Ranking.objects.filter(Season=2024))
+        self.assertEqual((report.inserted, report.updated, report.unchanged, report.deleted), (0, 1, 1, 1))
+        # Ranking 9 is outside the scope and stays.
+        self.assertEqual(self.rankings(), [(1, 1, 0), (3, 2, 0), (9, 1, 0)])
+        # A row that fails validation is kept as it was rather than deleted.
+        with self.assertLogs('oneFourSeven.ingest', 'WARNING'):
+            report = replace_rows(Ranking, RankingSerializer, [ranking(1, 1), {**ranking(3, 5), 'PlayerID': None}],
+                                  scope=Ranking.objects.filter(Season=2024))
+        self.assertEqual((report.deleted, report.invalid), (0, 1))
+        self.assertEqual(self.rankings(), [(1, 1, 0), (3, 2, 0), (9, 1, 0)])
+
+    def test_replace_rows_writes_nothing_when_the_delete_fails(self):
+        replace_rows(Ranking, RankingSerializer, [ranking(1, 1), ranking(2, 2)])
+        with mock.patch('oneFourSeven.ingest.delete_missing', side_effect=RuntimeError('disk full')), \
+                self.assertRaises(RuntimeError):
+            replace_rows(Ranking, RankingSerializer, [ranking(1, 2), ranking(3, 1)])
+        # The update and the insert that ran before the delete were rolled back with it.
+        self.assertEqual(self.rankings(), [(1, 1, 0), (2, 2, 0)])
+
+    def test_sync_rows_skips_rows_with_an_unchanged_fingerprint(self):
+        sync_rows(UpcomingMatch, UpcomingMatchSerializer, [match_row(1, 1), match_row(2, 1), match_row(3, 1)])
+        with mock.patch('oneFourSeven.ingest.validate_payload', wraps=validate_payload) as validate:
+            rows = [match_row(1, 1), match_row(2, 1, score1=1), match_row(3, 1)]
+            report = sync_rows(UpcomingMatch, UpcomingMatchSerializer, rows, scope=UpcomingMatch.objects.all())
+            # Unchanged rows are not even validated.
+            self.assertEqual([row['ID'] for row in validate.call_args.args[1]], [2])
+            self.assertEqual((report.updated, report.unchanged, report.written), (1, 2, 1))
+            report = sync_rows(UpcomingMatch, UpcomingMatchSerializer, rows[:2], scope=UpcomingMatch.objects.all())
+        self.assertEqual((report.updated, report.unchanged, report.deleted), (0, 2, 1))
+        self.assertEqual(validate.call_args.args[1], [])
+        self.assertEqual(list(UpcomingMatch.objects.order_by('ID').values_list('ID', 'Score1')), [(1, 0), (2, 1)])
+
+    def test_partial_match_syncs_never_delete(self):
+        def matches():
+            return list(MatchesOfAnEvent.objects.order_by('ID').values_list('ID', 'EventID', 'Score1'))
+
+        scraper.save_matches_of_an_event([match_row(1, 10), match_row(2, 10), match_row(3, 20)])
+        report = scraper.save_matches_of_an_event([match_row(2, 10, score1=1)], partial=True)
+        self.assertEqual((report.updated, report.deleted), (1, 0))
+        self.assertEqual(matches(), [(1, 10, 0), (2, 10, 1), (3, 20, 0)])
+        # The "updated since" listing covers every event; only the requested ones are stored.
+        updated = [match_row(1, 10, score1=2), match_row(3, 20, score1=4), match_row(4, 10)]
+        with mock.patch('oneFourSeven.scraper.fetch_from_api', return_value=updated) as fetch:
+            stored = scraper.matches_of_an_event(since=datetime.now(dt_timezone.utc) - timedelta(minutes=1),
+                                                 event_ids=[10])
+        self.assertRegex(fetch.call_args.args[0], r'[?&]ds=6[0-9]$')
+        self.assertEqual(sorted(stored.values_list('ID', flat=True)), [1, 2, 4])
+        self.assertEqual(matches(), [(1, 10, 2), (2, 10, 1), (3, 20, 0), (4, 10, 0)])
 
-# Create your tests here.
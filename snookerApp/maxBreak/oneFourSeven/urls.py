@@ -9,10 +9,15 @@ from .views import (
     EventList,
     PlayerList,
     RankingList,
+    season_events_view,
+    ranking_with_players_view,
     matches_of_an_event_view,
+    match_frames_view,
     player_by_id_view,
+    players_by_ids_view,
     upcoming_matches_view,
-    tour_details_view
+    tour_details_view,
+    live_scores_view,
 )
 
 router = routers.DefaultRouter()
@@ -24,11 +29,16 @@ urlpatterns = [
     path('logout/', logout, name='logout'),
 
     path('player_by_id/<int:player_id>/', player_by_id_view, name='player_details'),
+    path('players_by_ids/', players_by_ids_view, name='players_by_ids'),
 
     path('events/', EventList.as_view(), name='season_events'),
+    path('events/calendar/', season_events_view, name='event_calendar'),
     path('players/<str:sex>/', PlayerList.as_view(), name='players'),
     path('ranking/', RankingList.as_view(), name='ranking'),
+    path('ranking/players/', ranking_with_players_view, name='ranking_with_players'),
     path('matches/upcoming/', upcoming_matches_view, name='upcoming_matches'),
     path('curr_tour_matches/upcoming/', matches_of_an_event_view, name='curr_ev_matches'),
+    path('matches/<int:match_id>/frames/', match_frames_view, name='match_frames'),
+    path('live/', live_scores_view, name='live_scores'),
     path('tours/<int:event_id>/', tour_details_view, name='tour_details'),
 ]
\ No newline at end of file
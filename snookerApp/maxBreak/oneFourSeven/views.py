@@ -1,117 +1,253 @@
+import math
+
 from django.contrib.auth.models import User
 from rest_framework import viewsets, status, generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import api_view, permission_classes
+from django.conf import settings
 from django.core.paginator import Paginator
-from datetime import datetime
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import BooleanField, Case, Value, When
+from django.utils import timezone
+from django.utils.decorators import method_decorator
     
 
 
-from .models import MatchesOfAnEvent, Player, Ranking, Event, UpcomingMatch
-from .serializers import EventSerializer, MatchesOfAnEventSerializer, PlayerSerializer, RankingSerializer, UpcomingMatchSerializer, UserSerializer
+from .models import Frame, MatchesOfAnEvent, Player, Ranking, Event, UpcomingMatch
+from .serializers import (
+    EventSerializer, ExpandedMatchesOfAnEventSerializer, ExpandedUpcomingMatchSerializer, FrameSerializer,
+    MatchesOfAnEventSerializer, PlayerSerializer, RankingSerializer, RankingWithPlayerSerializer,
+    UpcomingMatchSerializer, UserSerializer, match_references, value_rows,
+)
+from .cache import versioned_response
+from .ratelimit import RateLimited
+from .live import event_stream
+from .listing import (
+    ListingMixin, OptionalCursorPagination, only_fields, restrict_fields, selected_fields, served_over_asgi,
+    stream_format, streaming_response,
+)
 
 from .scraper import (
-    get_tour_details,
+    get_tour_details, tracked_events,
 )
 
+@method_decorator(versioned_response(Event), name='dispatch')
 @permission_classes([AllowAny])
-class EventList(generics.ListAPIView):
+class EventList(ListingMixin, generics.ListAPIView):
+    values_fast_path = True
     queryset = Event.objects.all()
     serializer_class = EventSerializer
 
+@method_decorator(versioned_response(UpcomingMatch), name='dispatch')
 @permission_classes([AllowAny])
-class UpcomingMatchList(generics.ListAPIView):
+class UpcomingMatchList(ListingMixin, generics.ListAPIView):
     queryset = UpcomingMatch.objects.all()
     serializer_class = UpcomingMatchSerializer
 
+@method_decorator(versioned_response(MatchesOfAnEvent), name='dispatch')
 @permission_classes([AllowAny])
-class matches_of_an_event(generics.ListAPIView):
+class matches_of_an_event(ListingMixin, generics.ListAPIView):
     queryset = MatchesOfAnEvent.objects.all()
     serializer_class = MatchesOfAnEventSerializer
 
+@method_decorator(versioned_response(Player), name='dispatch')
 @permission_classes([AllowAny])
-class PlayerList(generics.ListAPIView):
+class PlayerList(ListingMixin, generics.ListAPIView):
+    values_fast_path = True
     serializer_class = PlayerSerializer
     def get_queryset(self):
         sex = self.kwargs['sex']
         return Player.objects.filter(Sex=sex)
 
+@method_decorator(versioned_response(Ranking), name='dispatch')
 @permission_classes([AllowAny])
-class RankingList(generics.ListAPIView):
+class RankingList(ListingMixin, generics.ListAPIView):
+    values_fast_path = True
     queryset = Ranking.objects.all()
     serializer_class = RankingSerializer
 
 
+def events_with_status(day):
+    """Events annotated with ``active`` / ``past`` relative to ``day``, computed by the database."""
+    return Event.objects.annotate(
+        active=Case(When(StartDate__lte=day, EndDate__gte=day, then=Value(True)),
+                    default=Value(False), output_field=BooleanField()),
+        past=Case(When(EndDate__lt=day, then=Value(True)), default=Value(False), output_field=BooleanField()),
+    )
+
+
+@versioned_response(Event, daily=True)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def season_events_view(request):
-    """API endpoint for season events with active, past flag and chronological order."""
-    events = Event.objects.all().order_by('StartDate') # order by start date
-    today = datetime.date.today()
-    serialized_events = []
-    for event in events:
-        serializer = EventSerializer(event)
-        event_data = serializer.data
-        start_date = event.StartDate
-        end_date = event.EndDate
-        event_data['active'] = start_date <= today <= end_date if start_date and end_date else False
-        event_data['past'] = end_date < today if end_date else False
-        serialized_events.append(event_data)
-    return Response(serialized_events)
+    """
+    API endpoint for the season calendar: events with active, past flag, in chronological order.
+    Query params: season (default: latest stored season), fields.
+    """
+    events = events_with_status(timezone.localdate())
+    season = request.GET.get('season')
+    if season:
+        if not (season.isascii() and season.isdigit()):
+            return Response({"error": "season must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        events = events.filter(Season=int(season))
+    else:
+        latest = Event.objects.exclude(Season=None).order_by('-Season').values('Season')[:1]
+        events = events.filter(Season=latest)
+    events = events.order_by('StartDate', 'ID') # order by start date
+    return Response(value_rows(events, EventSerializer, selected_fields(request, EventSerializer)))
+
+
+
+def wants_expanded(request):
+    """True for ?expand=1: match rows then include player and event names."""
+    return request.GET.get('expand', '').lower() in ('1', 'true', 'yes')
+
+
+def parse_event_ids(value, limit):
+    """
+    Event IDs from ``?event=1,2``; None when not given.
+    Raises ValueError for anything but IDs, or more than ``limit`` different IDs.
+    """
+    if not value:
+        return None
+    events = set()
+    for event_id in value.split(','):
+        event_id = event_id.strip()
+        if not event_id:
+            continue
+        if not (event_id.isascii() and event_id.isdigit()):
+            raise ValueError("event must be a comma-separated list of IDs.")
+        events.add(int(event_id))
+        if len(events) > limit:
+            raise ValueError(f"At most {limit} event IDs per request.")
+    return events
 
 
+def match_list_response(request, matches, serializer_class, expanded_serializer_class, per_page):
+    """
+    One page of ``matches``: ?page= pages of ``per_page`` by default, keyset pages (in ID order)
+    with ?cursor= / ?page_size=, ?fields= to pick fields and ?expand=1 for names.
+    ?stream=1 / ?stream=ndjson streams every match instead of one page.
+    """
+    expanded = wants_expanded(request)
+    stream = stream_format(request)
+    if expanded and stream:
+        return Response({"error": "expand is not available for streamed responses."}, status=status.HTTP_400_BAD_REQUEST)
+    if expanded:
+        serializer_class = expanded_serializer_class
+    fields = selected_fields(request, serializer_class)
+    if stream:
+        return streaming_response(request, matches, serializer_class, fields, stream)
+    if fields:
+        # The expanded fields are looked up through the ID columns.
+        matches = only_fields(matches, fields, ('EventID', 'Player1ID', 'Player2ID') if expanded else ())
 
+    cursor = OptionalCursorPagination()
+    matches_page = cursor.paginate_queryset(matches, request)
+    keyset = matches_page is not None
+    if not keyset:
+        paginator = Paginator(matches, per_page)
+        matches_page = list(paginator.get_page(request.GET.get('page')))
+    context = match_references(matches_page) if expanded else {}
+    serializer = serializer_class(matches_page, many=True, context=context)
+    if fields:
+        restrict_fields(serializer, fields)
+    if keyset:
+        return cursor.get_paginated_response(serializer.data)
+    return Response(serializer.data)
+
+
+@versioned_response(UpcomingMatch, Player, Event)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def upcoming_matches_view(request):
-    """API endpoint for upcoming matches, in the order they were added to the database, limited to 10."""
+    """
+    API endpoint for upcoming matches, in the order they were added to the database, limited to 10.
+    With ?expand=1 each match also carries Player1Name, Player2Name and EventName.
+    """
     matches = UpcomingMatch.objects.all()  
-    paginator = Paginator(matches, 10)
-    page = request.GET.get('page')
-    matches_page = paginator.get_page(page)
-    serializer = UpcomingMatchSerializer(matches_page, many=True)
-    return Response(serializer.data)
+    return match_list_response(request, matches, UpcomingMatchSerializer, ExpandedUpcomingMatchSerializer, 10)
 
+@versioned_response(MatchesOfAnEvent, Player, Event, daily=True)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def matches_of_an_event_view(request):
     """
     API endpoint for upcoming matches, sorted by ScheduledDate, limited to 20.
+    Query params: event (comma-separated event IDs, default: the events the scraper tracks today).
+    With ?expand=1 each match also carries Player1Name, Player2Name and EventName.
     """
-    matches = MatchesOfAnEvent.objects.all().order_by('ScheduledDate')  # מיון לפי ScheduledDate
-    paginator = Paginator(matches, 20)  
-    page = request.GET.get('page')
-    matches_page = paginator.get_page(page)
-    serializer = MatchesOfAnEventSerializer(matches_page, many=True)
-    return Response(serializer.data)
+    try:
+        events = parse_event_ids(request.GET.get('event'), getattr(settings, 'EVENT_FILTER_MAX_IDS', 50))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if events is None:
+        events = tracked_events().values('ID')
+    matches = MatchesOfAnEvent.objects.filter(EventID__in=events).order_by('ScheduledDate')  # מיון לפי ScheduledDate
+    return match_list_response(request, matches, MatchesOfAnEventSerializer, ExpandedMatchesOfAnEventSerializer, 20)
+
+@versioned_response(Frame, MatchesOfAnEvent)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def match_frames_view(request, match_id):
+    """API endpoint for a match's frames in order: each player's points, breaks and highest break."""
+    frames = value_rows(Frame.objects.filter(MatchID=match_id).order_by('Number'), FrameSerializer)
+    # Frames are deleted with their match, so only an empty list needs the match looked up.
+    if not frames and not MatchesOfAnEvent.objects.filter(ID=match_id).exists():
+        return Response({"error": f"Match with ID {match_id} not found in database."}, status=status.HTTP_404_NOT_FOUND)
+    return Response(frames)
 
+@versioned_response(Player)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def players_m_view(request):
     """API endpoint for men players' details."""
     players = Player.objects.filter(Sex='M')
-    serializer = PlayerSerializer(players, many=True)
-    return Response(serializer.data)
+    return Response(value_rows(players, PlayerSerializer))
 
+@versioned_response(Player)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def players_w_view(request):
     """API endpoint for women players' details."""
     players = Player.objects.filter(Sex='F')
-    serializer = PlayerSerializer(players, many=True)
-    return Response(serializer.data)
+    return Response(value_rows(players, PlayerSerializer))
 
+@versioned_response(Ranking)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def ranking_view(request):
     """API endpoint for ranking."""
     ranking = Ranking.objects.all()
-    serializer = RankingSerializer(ranking, many=True)
+    return Response(value_rows(ranking, RankingSerializer))
+
+
+@versioned_response(Ranking, Player)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ranking_with_players_view(request):
+    """
+    API endpoint for a ranking with each row's player name and nationality, in one query.
+    Query params: season (default: latest stored season of that type), type (default: MoneyRankings).
+    """
+    ranking_type = request.GET.get('type', 'MoneyRankings')
+    rankings = Ranking.objects.filter(Type=ranking_type)
+    season = request.GET.get('season')
+    if season:
+        if not (season.isascii() and season.isdigit()):
+            return Response({"error": "season must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        rankings = rankings.filter(Season=int(season))
+    else:
+        latest = Ranking.objects.filter(Type=ranking_type).order_by('-Season').values('Season')[:1]
+        rankings = rankings.filter(Season=latest)
+    rankings = rankings.select_related('player').order_by('Position')
+    serializer = RankingWithPlayerSerializer(rankings, many=True)
     return Response(serializer.data)
 
 
+@versioned_response(Player)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def player_by_id_view(request, player_id):
@@ -127,11 +263,94 @@ def player_by_id_view(request, player_id):
         return Response({"error": "Failed to get player details from database."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def parse_player_ids(request, limit):
+    """
+    IDs from ``?ids=1,2,3`` or a POST body ``{"ids": [1, 2, 3]}``, de-duplicated in request order.
+    Raises ValueError for anything but a list or comma-separated string of IDs, or more than ``limit`` IDs.
+    """
+    if request.method == 'POST':
+        raw = request.data.get('ids', []) if hasattr(request.data, 'get') else []
+    else:
+        raw = request.GET.get('ids', '')
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    elif not isinstance(raw, list):
+        raise ValueError("ids must be a list or a comma-separated string of player IDs.")
+    ids, seen = [], set()
+    for value in raw:
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+            if not (value.isascii() and value.isdigit()):
+                raise ValueError(f"Invalid player ID: {value!r}")
+            player_id = int(value)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            player_id = value
+        else:
+            raise ValueError(f"Invalid player ID: {value!r}")
+        if player_id in seen:
+            continue
+        seen.add(player_id)
+        ids.append(player_id)
+        if len(ids) > limit:
+            raise ValueError(f"At most {limit} player IDs per request.")
+    return ids
+
+
+@versioned_response(Player)
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def players_by_ids_view(request):
+    """
+    API endpoint for several players' details at once, resolved in a single query.
+    Returns {"players": {ID: details}, "missing": [IDs not in the database]}.
+    """
+    try:
+        ids = parse_player_ids(request, getattr(settings, 'PLAYER_BATCH_MAX_IDS', 200))
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    players = Player.objects.filter(ID__in=ids) if ids else Player.objects.none()
+    found = {player['ID']: player for player in PlayerSerializer(players, many=True).data}
+    return Response({
+        "players": {player_id: found[player_id] for player_id in ids if player_id in found},
+        "missing": [player_id for player_id in ids if player_id not in found],
+    })
+
+
+async def live_scores_view(request):
+    """
+    Server-Sent Events stream of match changes as the scraper stores them (see live.py).
+    Query params: event (comma-separated event IDs, default: the events the scraper tracks today).
+    Only served over ASGI: a WSGI server would never send the first byte of the endless stream.
+    """
+    if not served_over_asgi(request):
+        return JsonResponse({
+            "error": "The live stream needs the ASGI server (maxBreak.asgi). "
+                     "Poll /oneFourSeven/curr_tour_matches/upcoming/ for match updates instead.",
+        }, status=501)
+    try:
+        events = parse_event_ids(request.GET.get('event'), getattr(settings, 'EVENT_FILTER_MAX_IDS', 50))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    response = StreamingHttpResponse(event_stream(events), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def tour_details_view(request, event_id):
     """API endpoint for tour details by event ID."""
-    tour_details = get_tour_details(event_id) # Still fetches from API
+    # Still fetches from the API: never wait long for the rate limiter in a web request.
+    try:
+        tour_details = get_tour_details(event_id, max_wait=getattr(settings, 'SNOOKER_API_INTERACTIVE_MAX_WAIT', 2))
+    except RateLimited as e:
+        return Response({"error": "The snooker.org API budget is used up; try again later."},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={'Retry-After': str(math.ceil(e.retry_after))})
     if tour_details:
         return Response(tour_details)
     return Response({"error": "Failed to retrieve tour details."}, status=500)
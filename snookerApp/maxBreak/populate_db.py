@@ -63,7 +63,6 @@
 
 import os
 import django
-import time
 from datetime import datetime
 import logging
 
@@ -71,30 +70,14 @@ import logging
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'maxBreak.settings')
 django.setup()
 
-from oneFourSeven.scraper import get_ranking, get_season_events, get_players_m, get_players_w, get_a_players_m, get_upcoming_matches, matches_of_an_event
+from oneFourSeven.client import get_limiter
+from oneFourSeven.scraper import get_ranking, get_season_events, get_players_m, get_players_w, get_a_players_m, get_upcoming_matches, matches_of_an_event, refresh_feeds
 
 # הגדרת לוגינג
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# הגדרת מגבלת קצב (10 בקשות בדקה)
-REQUESTS_PER_MINUTE = 10
-SECONDS_PER_MINUTE = 60
-DELAY_BETWEEN_REQUESTS = SECONDS_PER_MINUTE / REQUESTS_PER_MINUTE
-
-last_request_time = None
-
 def make_api_request(api_function, *args, **kwargs):
-    global last_request_time
-    now = datetime.now()
-
-    if last_request_time:
-        time_since_last_request = (now - last_request_time).total_seconds()
-        if time_since_last_request < DELAY_BETWEEN_REQUESTS:
-            sleep_time = DELAY_BETWEEN_REQUESTS - time_since_last_request
-            logging.info(f"Waiting for {sleep_time:.2f} seconds to respect API rate limit.")
-            time.sleep(sleep_time)
-
-    last_request_time = now
+    # Rate limiting happens per HTTP call inside oneFourSeven.client, shared with every other process.
     try:
         return api_function(*args, **kwargs)
     except Exception as e:
@@ -124,14 +107,13 @@ def selective_update():
 def full_update():
     logging.info("Performing full update...")
 
-    # Fetch and save players (full update)
+    # Fetch and save players (full update); the three lists are fetched in parallel
     logging.info("Fetching and saving players (full update)...")
-    make_api_request(get_players_m)
-    make_api_request(get_players_w)
-    make_api_request(get_a_players_m)
+    make_api_request(refresh_feeds, ['players_m', 'players_w', 'a_players_m'])
 
     logging.info("Full update finished.")
 
+# One-shot update for cron; `python manage.py run_scheduler` keeps every feed fresh in one long-lived process.
 if __name__ == "__main__":
     logging.info("Starting database update...")
 
@@ -143,4 +125,7 @@ if __name__ == "__main__":
     if now.hour == 0:  # Perform full update at midnight
         full_update()
 
+    stats = get_limiter().stats()
+    logging.info(f"API budget: {stats['requests']} requests, {stats['waits']} waits, "
+                 f"{stats['wait_seconds']:.1f}s total wait (max {stats['max_wait']:.1f}s).")
     logging.info("Database update finished.")
\ No newline at end of file